@@ -0,0 +1,103 @@
+"""initial schema
+
+Revision ID: 0000_initial_schema
+Revises: 
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0000_initial_schema'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'users',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('email', sa.String(), nullable=True),
+        sa.Column('name', sa.String(), nullable=True),
+        sa.Column('hashed_password', sa.String(), nullable=True),
+        sa.Column('role', sa.String(), nullable=True),
+        sa.Column('is_profile_complete', sa.Boolean(), nullable=True),
+        sa.Column('gender', sa.String(), nullable=True),
+        sa.Column('age', sa.Integer(), nullable=True),
+        sa.Column('height', sa.Float(), nullable=True),
+        sa.Column('current_goal', sa.String(), nullable=True),
+        sa.Column('settings', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_users_id', 'users', ['id'])
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+
+    op.create_table(
+        'progress',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('user_id', sa.String(), nullable=True),
+        sa.Column('date', sa.DateTime(), nullable=True),
+        sa.Column('weight', sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_progress_id', 'progress', ['id'])
+
+    op.create_table(
+        'challenges',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('user_id', sa.String(), nullable=True),
+        sa.Column('type', sa.String(), nullable=True),
+        sa.Column('title', sa.String(), nullable=True),
+        sa.Column('goal', sa.Float(), nullable=True),
+        sa.Column('current', sa.Float(), nullable=True),
+        sa.Column('unit', sa.String(), nullable=True),
+        sa.Column('completed', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_challenges_id', 'challenges', ['id'])
+
+    op.create_table(
+        'workout_history',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('user_id', sa.String(), nullable=True),
+        sa.Column('date', sa.DateTime(), nullable=True),
+        sa.Column('workout_name', sa.String(), nullable=True),
+        sa.Column('duration_minutes', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_workout_history_id', 'workout_history', ['id'])
+
+    op.create_table(
+        'plans',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('user_id', sa.String(), nullable=True),
+        sa.Column('plan_data', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_plans_id', 'plans', ['id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_plans_id', table_name='plans')
+    op.drop_table('plans')
+    op.drop_index('ix_workout_history_id', table_name='workout_history')
+    op.drop_table('workout_history')
+    op.drop_index('ix_challenges_id', table_name='challenges')
+    op.drop_table('challenges')
+    op.drop_index('ix_progress_id', table_name='progress')
+    op.drop_table('progress')
+    op.drop_index('ix_users_email', table_name='users')
+    op.drop_index('ix_users_id', table_name='users')
+    op.drop_table('users')
@@ -0,0 +1,29 @@
+"""composite (user_id, date) indexes for progress and workout_history
+
+Revision ID: 0002_history_user_date_indexes
+Revises: 0001_user_token_version
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_history_user_date_indexes'
+down_revision = '0001_user_token_version'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY cannot run inside the migration transaction
+    with op.get_context().autocommit_block():
+        op.create_index('ix_progress_user_id_date', 'progress', ['user_id', 'date'], postgresql_concurrently=True)
+        op.create_index('ix_workout_history_user_id_date', 'workout_history', ['user_id', 'date'], postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_workout_history_user_id_date', table_name='workout_history', postgresql_concurrently=True)
+        op.drop_index('ix_progress_user_id_date', table_name='progress', postgresql_concurrently=True)
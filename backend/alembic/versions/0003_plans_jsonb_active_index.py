@@ -0,0 +1,54 @@
+"""plans.plan_data as JSONB, one active plan per user, GIN index on plan contents
+
+Revision ID: 0003_plans_jsonb_active_index
+Revises: 0002_history_user_date_indexes
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_plans_jsonb_active_index'
+down_revision = '0002_history_user_date_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Older save_plan runs could leave several active plans; keep the newest
+    op.execute("""
+        UPDATE plans SET is_active = false
+        WHERE is_active AND id NOT IN (
+            SELECT DISTINCT ON (user_id) id FROM plans
+            WHERE is_active
+            ORDER BY user_id, created_at DESC
+        )
+    """)
+    op.alter_column(
+        'plans', 'plan_data',
+        type_=postgresql.JSONB(),
+        existing_type=sa.JSON(),
+        postgresql_using='plan_data::jsonb',
+    )
+    op.create_index(
+        'ux_plans_user_id_active', 'plans', ['user_id'],
+        unique=True, postgresql_where=sa.text('is_active'),
+    )
+    op.create_index(
+        'ix_plans_plan_data', 'plans', ['plan_data'],
+        postgresql_using='gin', postgresql_ops={'plan_data': 'jsonb_path_ops'},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_plans_plan_data', table_name='plans')
+    op.drop_index('ux_plans_user_id_active', table_name='plans')
+    op.alter_column(
+        'plans', 'plan_data',
+        type_=sa.JSON(),
+        existing_type=postgresql.JSONB(),
+        postgresql_using='plan_data::json',
+    )
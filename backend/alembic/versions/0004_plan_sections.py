@@ -0,0 +1,42 @@
+"""plan_sections: deduplicated storage for archived plans
+
+Revision ID: 0004_plan_sections
+Revises: 0003_plans_jsonb_active_index
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_plan_sections'
+down_revision = '0003_plans_jsonb_active_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'plan_sections',
+        sa.Column('hash', sa.String(length=64), nullable=False),
+        sa.Column('data', postgresql.JSONB(), nullable=False),
+        sa.Column('size_bytes', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('hash'),
+    )
+    op.create_index(
+        'ix_plan_sections_data', 'plan_sections', ['data'],
+        postgresql_using='gin', postgresql_ops={'data': 'jsonb_path_ops'},
+    )
+    op.add_column('plans', sa.Column('section_refs', postgresql.JSONB(), nullable=True))
+    # Existing history is moved over by `python -m scripts.compact_plans`
+
+
+def downgrade() -> None:
+    # Archived plans must be expanded back into plan_data first:
+    # `python -m scripts.compact_plans --expand`
+    op.drop_column('plans', 'section_refs')
+    op.drop_index('ix_plan_sections_data', table_name='plan_sections')
+    op.drop_table('plan_sections')
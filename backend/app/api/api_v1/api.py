@@ -1,9 +1,20 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 
 from app.api.api_v1.endpoints import auth, users, plans, ai
+from app.core.rate_limit import RateLimit
 
 api_router = APIRouter()
-api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
-api_router.include_router(users.router, prefix="/users", tags=["users"])
-api_router.include_router(plans.router, prefix="/plans", tags=["plans"])
-api_router.include_router(ai.router, prefix="/ai", tags=["ai"]) 
\ No newline at end of file
+
+# Rate limit policies, counted per route and per client
+auth_rate_limit = RateLimit("auth", limit=10, window=60, by_ip=True)
+users_rate_limit = RateLimit("users", limit=120, window=60)
+plans_rate_limit = RateLimit("plans", limit=60, window=60)
+ai_rate_limit = RateLimit("ai", limit=20, window=60)
+# Clients poll jobs about once a second
+ai_jobs_rate_limit = RateLimit("ai_jobs", limit=120, window=60)
+
+api_router.include_router(auth.router, prefix="/auth", tags=["auth"], dependencies=[Depends(auth_rate_limit)])
+api_router.include_router(users.router, prefix="/users", tags=["users"], dependencies=[Depends(users_rate_limit)])
+api_router.include_router(plans.router, prefix="/plans", tags=["plans"], dependencies=[Depends(plans_rate_limit)])
+api_router.include_router(ai.router, prefix="/ai", tags=["ai"], dependencies=[Depends(ai_rate_limit)])
+api_router.include_router(ai.jobs_router, prefix="/ai", tags=["ai"], dependencies=[Depends(ai_jobs_rate_limit)])
\ No newline at end of file
@@ -1,25 +1,45 @@
-from typing import Any, Dict, List
-
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+import asyncio
+import json
+import math
+import time
+from typing import Any, Dict, List, Optional
 
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from app import worker
 from app.api import deps
+from app.core.config import settings
 from app.models.user import User
-from app.services import ai_service, user_service
-from app.db.base import get_db
+from app.services import ai_service, async_user_service, gemini_limits, single_flight
+from app.services.async_user_service import AnySession
+from app.db.base import get_async_db, AsyncSessionLocal, SessionLocal
 
 router = APIRouter()
+# Job polling has its own rate limit policy (see api_v1/api.py)
+jobs_router = APIRouter()
+
+JOB_POLL_INTERVAL_SECONDS = 1.0
+JOB_EVENTS_HEARTBEAT_SECONDS = 15.0
 
 
 @router.post("/generate-plan")
 async def generate_plan(
     *,
-    db: Session = Depends(get_db),
+    db: AnySession = Depends(get_async_db),
     goal: str,
+    fresh: bool = False,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
     current_user: User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
     Generate a personalized fitness and diet plan.
+    Set `fresh` to bypass the plan cache and force a new generation.
+    With background jobs enabled, returns 202 and a job to poll at /ai/jobs/{id}.
+
+    Concurrent identical requests (same user, goal and profile) share one
+    generation. Requests repeating an `Idempotency-Key` get the first result;
+    reusing a key with different parameters is rejected with 422.
     """
     try:
         if not current_user.is_profile_complete:
@@ -28,12 +48,55 @@ async def generate_plan(
                 detail="User profile is not complete. Cannot generate a personalized plan."
             )
         
-        plan_data = await ai_service.generate_plan(current_user, goal)
-        
-        # Сохраняем план в базе данных
-        user_service.save_plan(db, user_id=current_user.id, plan_data=plan_data)
-        
-        return plan_data
+        last_weight = await async_user_service.get_last_weight(db, user_id=current_user.id)
+        if idempotency_key:
+            flight_key = single_flight.make_key("idempotency", current_user.id, idempotency_key)
+            flight = {
+                "result_ttl": settings.IDEMPOTENCY_KEY_TTL_SECONDS,
+                "fingerprint": single_flight.make_key(goal, fresh),
+            }
+        else:
+            plan_inputs = ai_service.get_plan_inputs(current_user, goal, last_weight)
+            flight_key = single_flight.make_key("plan", current_user.id, ai_service.get_plan_cache_key(plan_inputs), fresh)
+            # fresh: join a generation in progress, never replay a finished one
+            flight = {"reuse_result": not fresh}
+
+        if settings.PLAN_JOBS_ENABLED:
+            async def enqueue_job() -> Dict[str, Any]:
+                # В eager-режиме задача выполняется сразу, поэтому не в цикле событий
+                job_id = await run_in_threadpool(
+                    worker.enqueue_plan_job, current_user.id, goal, use_cache=not fresh
+                )
+                return {"job_id": job_id}
+
+            job = await single_flight.run(flight_key, enqueue_job, **flight)
+            job_status = await run_in_threadpool(worker.get_job_status, job["job_id"], current_user.id)
+            return JSONResponse(
+                status_code=status.HTTP_202_ACCEPTED,
+                content=job_status,
+                headers={"Location": f"{settings.API_V1_STR}/ai/jobs/{job['job_id']}"},
+            )
+
+        async def generate_and_save() -> Dict[str, Any]:
+            plan_data = await ai_service.generate_plan(current_user, goal, last_weight, use_cache=not fresh)
+            # Сохраняем план в базе данных
+            await async_user_service.save_plan(db, user_id=current_user.id, plan_data=plan_data)
+            return plan_data
+
+        return await single_flight.run(flight_key, generate_and_save, **flight)
+    except single_flight.FingerprintMismatch:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was already used with different parameters"
+        )
+    except worker.JobStoreUnavailableError:
+        raise _job_store_unavailable()
+    except gemini_limits.GeminiUnavailableError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -46,10 +109,211 @@ async def generate_plan(
         )
 
 
+@router.post("/regenerate")
+async def regenerate_plan(
+    *,
+    db: AnySession = Depends(get_async_db),
+    sections: List[str] = Query(..., description="Sections to regenerate: fitnessPlan, dietPlan, requiredEquipment"),
+    goal: Optional[str] = None,
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Regenerate only some sections of the current plan and save the result as
+    a new plan version. The other sections are kept as they are and sent to
+    the model only as short context. `goal` defaults to the current plan's goal.
+    """
+    unknown = [name for name in sections if name not in ai_service.MODEL_SECTIONS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown plan sections: {', '.join(unknown)}"
+        )
+    
+    plan = await async_user_service.get_current_plan(db, user_id=current_user.id)
+    if not plan:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No active plan found"
+        )
+    plan_data = plan.plan_data
+    goal = goal or (plan_data.get("fitnessPlan") or {}).get("goal") or current_user.current_goal
+    
+    try:
+        last_weight = await async_user_service.get_last_weight(db, user_id=current_user.id)
+
+        async def regenerate_and_save() -> Dict[str, Any]:
+            new_plan = await ai_service.regenerate_sections(current_user, goal, last_weight, plan_data, sections)
+            await async_user_service.save_plan(db, user_id=current_user.id, plan_data=new_plan)
+            return new_plan
+
+        flight_key = single_flight.make_key("regenerate", current_user.id, plan.id, sorted(sections), goal)
+        return await single_flight.run(flight_key, regenerate_and_save)
+    except gemini_limits.GeminiUnavailableError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error regenerating plan: {str(e)}"
+        )
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _save_plan(user_id: str, plan_data: Dict[str, Any]) -> None:
+    # Сессия запроса к этому моменту уже закрыта, поэтому открываем свою
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            await async_user_service.save_plan(db, user_id=user_id, plan_data=plan_data)
+        return
+
+    db = SessionLocal()
+    try:
+        await async_user_service.save_plan(db, user_id=user_id, plan_data=plan_data)
+    finally:
+        await run_in_threadpool(db.close)
+
+
+@router.post("/generate-plan/stream")
+async def generate_plan_stream(
+    *,
+    db: AnySession = Depends(get_async_db),
+    goal: str,
+    fresh: bool = False,
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Generate a plan and stream it as Server-Sent Events: `token` events with raw
+    model output, a `section` event per completed top-level section, then `plan`
+    with the saved plan. Failures are reported as an `error` event.
+    """
+    if not current_user.is_profile_complete:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User profile is not complete. Cannot generate a personalized plan."
+        )
+    
+    # Входные данные собираем до начала потока, пока открыта сессия запроса
+    last_weight = await async_user_service.get_last_weight(db, user_id=current_user.id)
+    plan_inputs = ai_service.get_plan_inputs(current_user, goal, last_weight)
+    targets = ai_service.get_plan_targets(current_user, goal, last_weight)
+    user_id = current_user.id
+
+    async def events():
+        try:
+            async for event, payload in ai_service.stream_plan(plan_inputs, use_cache=not fresh, targets=targets):
+                if event == "token":
+                    yield _sse("token", {"text": payload})
+                elif event == "section":
+                    name, value = payload
+                    yield _sse("section", {"name": name, "data": value})
+                else:
+                    await _save_plan(user_id, payload)
+                    yield _sse("plan", payload)
+        except Exception as e:
+            yield _sse("error", {"detail": f"Error generating plan: {str(e)}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _job_store_unavailable() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Plan jobs are temporarily unavailable",
+        headers={"Retry-After": str(worker.JOB_STORE_RETRY_AFTER_SECONDS)},
+    )
+
+
+async def _get_job_or_404(job_id: str, user_id: str) -> Dict[str, Any]:
+    try:
+        job = await run_in_threadpool(worker.get_job_status, job_id, user_id)
+    except worker.JobStoreUnavailableError:
+        raise _job_store_unavailable()
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    return job
+
+
+@jobs_router.get("/jobs/{job_id}")
+async def get_plan_job(
+    *,
+    job_id: str,
+    wait: int = Query(0, ge=0, description="Long-poll: seconds to wait for the job to finish"),
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Get the status of a plan generation job, and the plan once it has succeeded.
+    """
+    deadline = time.monotonic() + min(wait, settings.PLAN_JOB_MAX_WAIT_SECONDS)
+    while True:
+        job = await _get_job_or_404(job_id, current_user.id)
+        if job["status"] in worker.FINAL_JOB_STATES or time.monotonic() >= deadline:
+            return job
+        await asyncio.sleep(JOB_POLL_INTERVAL_SECONDS)
+
+
+@jobs_router.get("/jobs/{job_id}/events")
+async def stream_plan_job(
+    *,
+    job_id: str,
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Stream job status changes as Server-Sent Events until the job finishes.
+    """
+    job = await _get_job_or_404(job_id, current_user.id)
+    user_id = current_user.id
+
+    async def events():
+        last_status = None
+        last_sent = time.monotonic()
+        current = job
+        while True:
+            if current["status"] != last_status:
+                last_status = current["status"]
+                last_sent = time.monotonic()
+                yield _sse("status", current)
+            elif time.monotonic() - last_sent >= JOB_EVENTS_HEARTBEAT_SECONDS:
+                last_sent = time.monotonic()
+                yield ": keep-alive\n\n"
+            if current["status"] in worker.FINAL_JOB_STATES:
+                return
+            await asyncio.sleep(JOB_POLL_INTERVAL_SECONDS)
+            try:
+                current = await _get_job_or_404(job_id, user_id)
+            except HTTPException as e:
+                # The response has started; report the error as an event
+                yield _sse("error", {"detail": e.detail})
+                return
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("/chat-config")
 async def get_chat_config(
     *,
-    db: Session = Depends(get_db),
+    db: AnySession = Depends(get_async_db),
     current_user: User = Depends(deps.get_premium_user),
 ) -> Any:
     """
@@ -57,7 +321,7 @@ async def get_chat_config(
     """
     try:
         # Получаем текущий план пользователя
-        plan = user_service.get_current_plan(db, user_id=current_user.id)
+        plan = await async_user_service.get_current_plan(db, user_id=current_user.id)
         if not plan:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -3,50 +3,62 @@ from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
 
 from app.api import deps
+from app.core import security
 from app.core.config import settings
 from app.core.security import create_access_token
-from app.schemas.user import User, UserCreate, Token
-from app.services import user_service
-from app.db.base import get_db
+from app.schemas.user import User, UserCreate, UserInDB, Token, Principal
+from app.services import async_user_service
+from app.services.async_user_service import AnySession
+from app.db.base import get_async_db
 
 router = APIRouter()
 
 
 @router.post("/register", response_model=User, status_code=status.HTTP_201_CREATED)
-def register(
+async def register(
     *,
-    db: Session = Depends(get_db),
+    db: AnySession = Depends(get_async_db),
     user_in: UserCreate,
 ) -> Any:
     """
     Register new user.
     """
-    user = user_service.get_user_by_email(db, email=user_in.email)
+    user = await async_user_service.get_user_by_email(db, email=user_in.email)
     if user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="User with this email already exists",
         )
     
-    user = user_service.create_user(db, user_in=user_in)
-    return user
+    # bcrypt runs in the dedicated hashing process pool
+    hashed_password = await security.get_password_hash_async(user_in.password)
+    user = await async_user_service.create_user(db, user_in=user_in, hashed_password=hashed_password)
+    # A new user has no embedded collections; skip loading them
+    return UserInDB.model_validate(user)
 
 
 @router.post("/login", response_model=Token)
-def login(
-    db: Session = Depends(get_db),
+async def login(
+    db: AnySession = Depends(get_async_db),
     form_data: OAuth2PasswordRequestForm = Depends(),
 ) -> Any:
     """
     OAuth2 compatible token login, get an access token for future requests.
     """
-    user = user_service.authenticate_user(
-        db, email=form_data.username, password=form_data.password
-    )
-    if not user:
+    user = await async_user_service.get_user_by_email(db, email=form_data.username)
+    valid = False
+    if user:
+        # Read claims before a possible commit expires the instance
+        user_id, role, token_version = user.id, user.role, user.token_version
+        valid, new_hash = await security.verify_and_update_password_async(
+            form_data.password, user.hashed_password
+        )
+        if valid and new_hash:
+            # Stored hash used an outdated bcrypt cost
+            await async_user_service.set_password_hash(db, user_id=user_id, hashed_password=new_hash)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -56,7 +68,24 @@ def login(
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     return {
         "access_token": create_access_token(
-            subject=user.id, expires_delta=access_token_expires
+            subject=user_id,
+            expires_delta=access_token_expires,
+            role=role,
+            token_version=token_version,
         ),
         "token_type": "bearer",
-    } 
\ No newline at end of file
+    }
+
+
+@router.post("/logout-all", status_code=status.HTTP_204_NO_CONTENT)
+async def logout_all(
+    db: AnySession = Depends(get_async_db),
+    principal: Principal = Depends(deps.get_current_principal),
+) -> None:
+    """
+    Revoke all access tokens of the current user, on every device.
+    """
+    try:
+        await async_user_service.revoke_tokens(db, user_id=principal.id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
@@ -1,15 +1,20 @@
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
 
 from app.api import deps
 from app.models.user import User, Plan
-from app.services import user_service
+from app.schemas.user import PlanRecord, Principal
+from app.core.config import settings
+from app.services import resource_versions, response_cache, user_service
 from app.db.base import get_db
 
 router = APIRouter()
 
+plan_etag = deps.ConditionalGet(resource_versions.PLAN)
+
 
 @router.post("/generate", status_code=status.HTTP_201_CREATED)
 def generate_plan(
@@ -27,23 +32,53 @@ def generate_plan(
             detail="User profile is not complete. Cannot generate a personalized plan."
         )
     
-    plan = user_service.save_plan(db, user_id=current_user.id, plan_data=plan_data)
-    return plan.plan_data
+    user_service.save_plan(db, user_id=current_user.id, plan_data=plan_data)
+    # Serialized once, without reloading the stored row
+    return Response(
+        content=orjson.dumps(plan_data),
+        media_type="application/json",
+        status_code=status.HTTP_201_CREATED,
+    )
 
 
 @router.get("/current")
 def get_current_plan(
     *,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user),
+    response: Response,
+    principal: Principal = Depends(deps.get_current_principal),
+    etag: Optional[str] = Depends(plan_etag),
 ) -> Any:
     """
     Get the current active plan for the user.
+    The stored JSON is returned as is, without decoding and re-encoding it.
     """
-    plan = user_service.get_current_plan(db, user_id=current_user.id)
-    if not plan:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="No active plan found"
-        )
-    return plan.plan_data 
\ No newline at end of file
+    def build() -> str:
+        plan_json = user_service.get_current_plan_json(db, user_id=principal.id)
+        if plan_json is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="No active plan found"
+            )
+        return plan_json
+
+    return response_cache.respond(etag, settings.RESPONSE_CACHE_PLAN_TTL_SECONDS, response, build)
+
+
+@router.get("/search", response_model=List[PlanRecord])
+def search_plans(
+    *,
+    db: Session = Depends(get_db),
+    goal: Optional[str] = None,
+    equipment: Optional[str] = None,
+    active_only: bool = True,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    current_user: User = Depends(deps.get_admin_user),
+) -> Any:
+    """
+    Search stored plans by goal and/or required equipment. Admin only.
+    """
+    return user_service.search_plans(
+        db, goal=goal, equipment=equipment, active_only=active_only, skip=skip, limit=limit
+    )
@@ -1,25 +1,113 @@
-from typing import Any, List
+from datetime import datetime
+from functools import partial
+from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
 
 from app.api import deps
+from app.core.config import settings
+from app.core.security import create_access_token
 from app.models.user import User
-from app.schemas.user import UserUpdate, User as UserSchema, Progress, WorkoutHistory, WorkoutHistoryCreate, ProgressCreate
-from app.services import user_service
+from app.schemas.user import UserUpdate, User as UserSchema, Progress, WorkoutHistory, WorkoutHistoryCreate, ProgressCreate, Principal, ProgressBucketSize, ProgressSummary, Dashboard, DashboardSection, PremiumUpgrade
+from app.services import dashboard, pagination, progress_analytics, resource_versions, response_cache, user_service
 from app.db.base import get_db
 
 router = APIRouter()
 
+profile_etag = deps.ConditionalGet(
+    resource_versions.PROFILE, resource_versions.PROGRESS, resource_versions.WORKOUTS, resource_versions.CHALLENGES
+)
+progress_etag = deps.ConditionalGet(resource_versions.PROGRESS)
+workouts_etag = deps.ConditionalGet(resource_versions.WORKOUTS)
+# Today's challenges change at midnight without a write
+dashboard_etag = deps.ConditionalGet(
+    resource_versions.PROFILE,
+    resource_versions.PLAN,
+    resource_versions.PROGRESS,
+    resource_versions.WORKOUTS,
+    resource_versions.CHALLENGES,
+    scope=lambda: datetime.utcnow().date().isoformat(),
+)
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def history_params(
+    date_from: Optional[datetime] = Query(None, alias="from", description="Inclusive lower bound on date"),
+    date_to: Optional[datetime] = Query(None, alias="to", description="Exclusive upper bound on date"),
+    cursor: Optional[str] = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} response header"),
+    limit: Optional[int] = Query(
+        None, ge=1, le=settings.HISTORY_PAGE_MAX_LIMIT,
+        description=f"Page size; {settings.HISTORY_PAGE_DEFAULT_LIMIT} when paging with a cursor. "
+        f"Without limit and cursor the first {settings.HISTORY_PAGE_MAX_LIMIT} entries are returned",
+    ),
+) -> Dict[str, Any]:
+    return {"date_from": date_from, "date_to": date_to, "cursor": cursor, "limit": limit}
+
+
+def _history_page(response: Response, fetch, user_id: str, params: Dict[str, Any]) -> List[Any]:
+    limit = params["limit"]
+    if limit is None:
+        # Unpaged requests from clients that predate paging get the largest
+        # page; the cursor header tells them when the history is longer
+        limit = settings.HISTORY_PAGE_DEFAULT_LIMIT if params["cursor"] else settings.HISTORY_PAGE_MAX_LIMIT
+    try:
+        # One extra row tells whether another page exists
+        items = fetch(user_id=user_id, **{**params, "limit": limit + 1})
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    page, next_cursor = pagination.paginate(items, limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return page
+
 
 @router.get("/me", response_model=UserSchema)
 def get_current_user(
+    *,
+    db: Session = Depends(get_db),
+    response: Response,
     current_user: User = Depends(deps.get_current_active_user),
+    etag: Optional[str] = Depends(profile_etag),
 ) -> Any:
     """
     Get current user.
     """
-    return current_user
+    return response_cache.respond(
+        etag,
+        settings.RESPONSE_CACHE_PROFILE_TTL_SECONDS,
+        response,
+        lambda: user_service.get_user_profile(db, current_user),
+        UserSchema,
+    )
+
+
+@router.get("/me/dashboard", response_model=Dashboard)
+async def get_dashboard(
+    *,
+    response: Response,
+    sections: List[DashboardSection] = Query(list(DashboardSection), description="Sections to include"),
+    limit: int = Query(
+        settings.DASHBOARD_DEFAULT_ITEMS, ge=1, le=settings.HISTORY_PAGE_MAX_LIMIT,
+        description="Latest progress points and workouts to include",
+    ),
+    principal: Principal = Depends(deps.get_current_principal),
+    etag: Optional[str] = Depends(dashboard_etag),
+) -> Any:
+    """
+    Profile, current plan, today's challenges, recent progress and recent
+    workouts in one request; the sections are queried concurrently.
+    """
+    return await response_cache.respond_async(
+        etag,
+        settings.RESPONSE_CACHE_DASHBOARD_TTL_SECONDS,
+        response,
+        partial(dashboard.build_dashboard, principal.id, sections, limit),
+    )
 
 
 @router.put("/me", response_model=UserSchema)
@@ -33,33 +121,80 @@ def update_current_user(
     Update current user.
     """
     user = user_service.update_user(db, user_id=current_user.id, user_in=user_in)
-    return user
+    return user_service.get_user_profile(db, user)
 
 
-@router.post("/me/premium", response_model=UserSchema)
+@router.post("/me/premium", response_model=PremiumUpgrade)
 def upgrade_to_premium(
     *,
     db: Session = Depends(get_db),
     current_user: User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
-    Upgrade current user to premium.
+    Upgrade current user to premium. Returns a new access token: the role
+    claim of earlier tokens is stale, so they are revoked.
     """
     user = user_service.upgrade_to_premium(db, user_id=current_user.id)
-    return user
+    return {
+        **user_service.get_user_profile(db, user),
+        "access_token": create_access_token(subject=user.id, role=user.role, token_version=user.token_version),
+        "token_type": "bearer",
+    }
 
 
 @router.get("/me/progress", response_model=List[Progress])
 def get_user_progress(
     *,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user),
+    response: Response,
+    params: Dict[str, Any] = Depends(history_params),
+    principal: Principal = Depends(deps.get_current_principal),
+    etag: Optional[str] = Depends(progress_etag),
 ) -> Any:
     """
-    Get user progress history.
+    Get user progress history, oldest first, one page at a time.
     """
-    progress = user_service.get_user_progress(db, user_id=current_user.id)
-    return progress
+    return response_cache.respond(
+        etag,
+        settings.RESPONSE_CACHE_HISTORY_TTL_SECONDS,
+        response,
+        lambda: _history_page(response, partial(user_service.get_user_progress, db), principal.id, params),
+        List[Progress],
+    )
+
+
+@router.get("/me/progress/summary", response_model=ProgressSummary)
+def get_user_progress_summary(
+    *,
+    db: Session = Depends(get_db),
+    response: Response,
+    bucket: ProgressBucketSize = ProgressBucketSize.day,
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
+    points: int = Query(settings.PROGRESS_SUMMARY_DEFAULT_POINTS, ge=2, le=settings.PROGRESS_SUMMARY_MAX_POINTS),
+    window: int = Query(7, ge=1, le=365, description="Moving average window, in buckets"),
+    principal: Principal = Depends(deps.get_current_principal),
+    etag: Optional[str] = Depends(progress_etag),
+) -> Any:
+    """
+    Get aggregated, downsampled progress for charts.
+    """
+    response.headers["Cache-Control"] = f"private, max-age={settings.PROGRESS_SUMMARY_CACHE_SECONDS}"
+    return response_cache.respond(
+        etag,
+        settings.RESPONSE_CACHE_HISTORY_TTL_SECONDS,
+        response,
+        lambda: progress_analytics.get_progress_summary(
+            db,
+            user_id=principal.id,
+            bucket=bucket,
+            date_from=date_from,
+            date_to=date_to,
+            points=points,
+            window=window,
+        ),
+        ProgressSummary,
+    )
 
 
 @router.post("/me/progress", response_model=Progress)
@@ -80,13 +215,21 @@ def add_user_progress(
 def get_workout_history(
     *,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user),
+    response: Response,
+    params: Dict[str, Any] = Depends(history_params),
+    principal: Principal = Depends(deps.get_current_principal),
+    etag: Optional[str] = Depends(workouts_etag),
 ) -> Any:
     """
-    Get user workout history.
+    Get user workout history, newest first, one page at a time.
     """
-    history = user_service.get_workout_history(db, user_id=current_user.id)
-    return history
+    return response_cache.respond(
+        etag,
+        settings.RESPONSE_CACHE_HISTORY_TTL_SECONDS,
+        response,
+        lambda: _history_page(response, partial(user_service.get_workout_history, db), principal.id, params),
+        List[WorkoutHistory],
+    )
 
 
 @router.post("/me/workout-history", response_model=WorkoutHistory)
@@ -114,4 +257,4 @@ def toggle_challenge(
     Toggle challenge completion status.
     """
     user_service.toggle_challenge(db, user_id=current_user.id, challenge_id=challenge_id)
-    return current_user 
\ No newline at end of file
+    return user_service.get_user_profile(db, current_user) 
\ No newline at end of file
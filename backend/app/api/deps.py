@@ -1,6 +1,7 @@
-from typing import Generator, Optional
+import hashlib
+from typing import Callable, Generator, Optional
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, Response, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from pydantic import ValidationError
@@ -8,39 +9,67 @@ from sqlalchemy.orm import Session
 
 from app.db.base import get_db
 from app.models.user import User
-from app.schemas.user import TokenPayload
+from app.schemas.user import TokenPayload, Principal
 from app.core.config import settings
-from app.services import user_service
+from app.services import resource_versions, user_cache, user_service
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
+credentials_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
+)
 
-def get_current_user(
-    db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme)
-) -> User:
+
+def get_token_data(token: str = Depends(oauth2_scheme)) -> TokenPayload:
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
         )
-        token_data = TokenPayload(**payload)
+        return TokenPayload(**payload)
     except (JWTError, ValidationError):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    user = user_service.get_user_by_id(db, token_data.sub)
+        raise credentials_exception
+
+
+def get_current_user(
+    db: Session = Depends(get_db),
+    token_data: TokenPayload = Depends(get_token_data),
+) -> User:
+    user = user_service.get_user_by_id_cached(db, token_data.sub)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
+    if token_data.ver is not None and token_data.ver != user.token_version:
+        raise credentials_exception
     
     return user
 
 
+def get_current_principal(
+    db: Session = Depends(get_db),
+    token_data: TokenPayload = Depends(get_token_data),
+) -> Principal:
+    """
+    Identity and role straight from the token claims, for routes that only
+    need the user id. Tokens issued before role/ver claims existed fall back
+    to the full user lookup.
+    """
+    if token_data.role is None:
+        user = get_current_user(db, token_data)
+        return Principal(id=user.id, role=user.role)
+    
+    # Revocation is checked against the cached row or the marker left by
+    # user_service.revoke_tokens; otherwise the claims are trusted
+    token_version = user_cache.get_token_version(token_data.sub)
+    if token_version is not None and token_data.ver is not None and token_data.ver != token_version:
+        raise credentials_exception
+    
+    return Principal(id=token_data.sub, role=token_data.role)
+
+
 def get_current_active_user(
     current_user: User = Depends(get_current_user),
 ) -> User:
@@ -66,4 +95,42 @@ def get_admin_user(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin privileges required"
         )
-    return current_user 
\ No newline at end of file
+    return current_user 
+
+
+class ConditionalGet:
+    """
+    Strong ETag for a user-scoped GET, derived from the route, the query
+    string and the versions of the resources it reads. Answers 304 before
+    the endpoint runs when If-None-Match matches. Returns the ETag (None if
+    versions are unavailable) for endpoints that build their own Response.
+    `scope` adds inputs that change without a write, e.g. the current date.
+    """
+
+    def __init__(self, *resources: str, scope: Optional[Callable[[], str]] = None):
+        self.resources = resources
+        self.scope = scope
+
+    def __call__(
+        self,
+        request: Request,
+        response: Response,
+        principal: Principal = Depends(get_current_principal),
+    ) -> Optional[str]:
+        versions = resource_versions.get_versions(principal.id, self.resources)
+        if versions is None:
+            return None
+
+        parts = [request.url.path, str(request.query_params), principal.id, *versions]
+        if self.scope is not None:
+            parts.append(self.scope())
+        raw = "|".join(parts)
+        etag = '"' + hashlib.sha1(raw.encode("utf-8")).hexdigest() + '"'
+        if_none_match = request.headers.get("If-None-Match", "")
+        if etag in (tag.strip() for tag in if_none_match.split(",")) or if_none_match.strip() == "*":
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+        response.headers["ETag"] = etag
+        # Clients must revalidate; the ETag keeps that cheap
+        response.headers["Cache-Control"] = "private, no-cache"
+        return etag
@@ -16,6 +16,28 @@ class Settings(BaseSettings):
     SECRET_KEY: str = os.getenv("SECRET_KEY", "supersecretkey")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7  # 7 days
+    # Password hashes with a different cost are rehashed on the next login
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    # Processes in the password hashing pool; 0 = one per CPU core
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "0"))
+
+    # Cache of user rows for get_current_user: "redis", "none", or "memory" for a
+    # single worker only (invalidation does not reach other processes)
+    USER_CACHE_BACKEND: str = os.getenv("USER_CACHE_BACKEND", "redis")
+    USER_CACHE_TTL_SECONDS: int = int(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+    USER_CACHE_MAX_ENTRIES: int = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+
+    # Per-user resource versions behind ETags ("redis", or "memory" for a single process)
+    RESOURCE_VERSION_BACKEND: str = os.getenv("RESOURCE_VERSION_BACKEND", "redis")
+    RESOURCE_VERSION_TTL_SECONDS: int = int(os.getenv("RESOURCE_VERSION_TTL_SECONDS", str(60 * 60 * 24 * 30)))
+    # Serialized GET responses keyed by their ETag: "redis" (with a local tier), "memory" or "none"
+    RESPONSE_CACHE_BACKEND: str = os.getenv("RESPONSE_CACHE_BACKEND", "redis")
+    RESPONSE_CACHE_LOCAL_TTL_SECONDS: int = int(os.getenv("RESPONSE_CACHE_LOCAL_TTL_SECONDS", "10"))
+    RESPONSE_CACHE_LOCAL_MAX_ENTRIES: int = int(os.getenv("RESPONSE_CACHE_LOCAL_MAX_ENTRIES", "2000"))
+    RESPONSE_CACHE_PROFILE_TTL_SECONDS: int = int(os.getenv("RESPONSE_CACHE_PROFILE_TTL_SECONDS", "300"))
+    RESPONSE_CACHE_PLAN_TTL_SECONDS: int = int(os.getenv("RESPONSE_CACHE_PLAN_TTL_SECONDS", "3600"))
+    RESPONSE_CACHE_HISTORY_TTL_SECONDS: int = int(os.getenv("RESPONSE_CACHE_HISTORY_TTL_SECONDS", "600"))
+    RESPONSE_CACHE_DASHBOARD_TTL_SECONDS: int = int(os.getenv("RESPONSE_CACHE_DASHBOARD_TTL_SECONDS", "300"))
     
     # Database
     POSTGRES_SERVER: str = os.getenv("POSTGRES_SERVER", "localhost")
@@ -23,13 +45,94 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str = os.getenv("POSTGRES_PASSWORD", "postgres")
     POSTGRES_DB: str = os.getenv("POSTGRES_DB", "ussr_space_db")
     SQLALCHEMY_DATABASE_URI: Optional[str] = None
+    # Connection pool (per engine, per worker process)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds, -1 disables
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    DB_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))  # 0 disables
+    # Max items of each collection (progress, challenges, workouts) embedded in /users/me; 0 = no cap
+    USER_EMBEDDED_COLLECTION_LIMIT: int = int(os.getenv("USER_EMBEDDED_COLLECTION_LIMIT", "100"))
+    # Keyset pagination of progress / workout history
+    HISTORY_PAGE_DEFAULT_LIMIT: int = int(os.getenv("HISTORY_PAGE_DEFAULT_LIMIT", "100"))
+    HISTORY_PAGE_MAX_LIMIT: int = int(os.getenv("HISTORY_PAGE_MAX_LIMIT", "1000"))
+    # /users/me/progress/summary
+    PROGRESS_SUMMARY_DEFAULT_POINTS: int = int(os.getenv("PROGRESS_SUMMARY_DEFAULT_POINTS", "200"))
+    PROGRESS_SUMMARY_MAX_POINTS: int = int(os.getenv("PROGRESS_SUMMARY_MAX_POINTS", "2000"))
+    PROGRESS_SUMMARY_CACHE_SECONDS: int = int(os.getenv("PROGRESS_SUMMARY_CACHE_SECONDS", "60"))
+    # /users/me/dashboard: default number of progress points and workouts
+    DASHBOARD_DEFAULT_ITEMS: int = int(os.getenv("DASHBOARD_DEFAULT_ITEMS", "30"))
+    # Async engine (asyncpg) for async endpoints; the sync engine stays available
+    DB_ASYNC_ENABLED: bool = os.getenv("DB_ASYNC_ENABLED", "false").lower() == "true"
+    SQLALCHEMY_ASYNC_DATABASE_URI: Optional[str] = None
     
     # Google Gemini API
     GEMINI_API_KEY: Optional[str] = os.getenv("GEMINI_API_KEY")
-    
+
+    # Shared HTTP client for Gemini (one pool per worker process)
+    GEMINI_HTTP2: bool = os.getenv("GEMINI_HTTP2", "true").lower() == "true"
+    GEMINI_MAX_CONNECTIONS: int = int(os.getenv("GEMINI_MAX_CONNECTIONS", "50"))
+    GEMINI_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("GEMINI_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    GEMINI_KEEPALIVE_EXPIRY: float = float(os.getenv("GEMINI_KEEPALIVE_EXPIRY", "30"))
+    GEMINI_CONNECT_TIMEOUT: float = float(os.getenv("GEMINI_CONNECT_TIMEOUT", "5"))
+    GEMINI_READ_TIMEOUT: float = float(os.getenv("GEMINI_READ_TIMEOUT", "60"))
+    GEMINI_WRITE_TIMEOUT: float = float(os.getenv("GEMINI_WRITE_TIMEOUT", "10"))
+    GEMINI_POOL_TIMEOUT: float = float(os.getenv("GEMINI_POOL_TIMEOUT", "5"))
+    # Override to point at a local fake Gemini server in tests
+    GEMINI_BASE_URL: str = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta")
+
+    # Gemini load protection: limits are shared by all workers through Redis
+    # ("redis"), with an in-process fallback ("memory") if Redis is unreachable
+    GEMINI_LIMITER_BACKEND: str = os.getenv("GEMINI_LIMITER_BACKEND", "redis")
+    GEMINI_MAX_CONCURRENCY: int = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+    GEMINI_RATE_PER_MINUTE: float = float(os.getenv("GEMINI_RATE_PER_MINUTE", "60"))
+    GEMINI_RATE_BURST: int = int(os.getenv("GEMINI_RATE_BURST", "10"))
+    GEMINI_ACQUIRE_TIMEOUT: float = float(os.getenv("GEMINI_ACQUIRE_TIMEOUT", "30"))
+    GEMINI_MAX_RETRIES: int = int(os.getenv("GEMINI_MAX_RETRIES", "3"))
+    GEMINI_BACKOFF_BASE: float = float(os.getenv("GEMINI_BACKOFF_BASE", "0.5"))
+    GEMINI_BACKOFF_MAX: float = float(os.getenv("GEMINI_BACKOFF_MAX", "20"))
+    GEMINI_BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("GEMINI_BREAKER_FAILURE_THRESHOLD", "5"))
+    GEMINI_BREAKER_RESET_SECONDS: float = float(os.getenv("GEMINI_BREAKER_RESET_SECONDS", "30"))
+
     # Redis
     REDIS_HOST: str = os.getenv("REDIS_HOST", "localhost")
     REDIS_PORT: int = int(os.getenv("REDIS_PORT", "6379"))
+    REDIS_DB: int = int(os.getenv("REDIS_DB", "0"))
+    REDIS_SOCKET_TIMEOUT: float = float(os.getenv("REDIS_SOCKET_TIMEOUT", "1"))
+
+    # Rate limiting: sliding windows in Redis ("redis") or per process ("memory", tests)
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "redis")
+
+    # Plan cache (content-addressed by normalized prompt inputs)
+    PLAN_CACHE_ENABLED: bool = os.getenv("PLAN_CACHE_ENABLED", "true").lower() == "true"
+    PLAN_CACHE_TTL_SECONDS: int = int(os.getenv("PLAN_CACHE_TTL_SECONDS", str(60 * 60 * 24)))
+    PLAN_CACHE_MAX_ENTRIES: int = int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "10000"))
+    PLAN_CACHE_AGE_BUCKET: int = int(os.getenv("PLAN_CACHE_AGE_BUCKET", "5"))  # years
+    PLAN_CACHE_HEIGHT_BUCKET: int = int(os.getenv("PLAN_CACHE_HEIGHT_BUCKET", "5"))  # cm
+    PLAN_CACHE_WEIGHT_BUCKET: int = int(os.getenv("PLAN_CACHE_WEIGHT_BUCKET", "2"))  # kg
+
+    # Nightly recompute of calorie/macro targets in stored plans (Celery beat)
+    NUTRITION_RECOMPUTE_HOUR: int = int(os.getenv("NUTRITION_RECOMPUTE_HOUR", "3"))  # UTC
+    NUTRITION_BATCH_SIZE: int = int(os.getenv("NUTRITION_BATCH_SIZE", "1000"))
+
+    # Coalescing of identical concurrent plan generations ("redis" or "memory")
+    PLAN_SINGLEFLIGHT_BACKEND: str = os.getenv("PLAN_SINGLEFLIGHT_BACKEND", "redis")
+    PLAN_SINGLEFLIGHT_LOCK_SECONDS: int = int(os.getenv("PLAN_SINGLEFLIGHT_LOCK_SECONDS", "120"))
+    PLAN_SINGLEFLIGHT_RESULT_TTL_SECONDS: int = int(os.getenv("PLAN_SINGLEFLIGHT_RESULT_TTL_SECONDS", "30"))
+    IDEMPOTENCY_KEY_TTL_SECONDS: int = int(os.getenv("IDEMPOTENCY_KEY_TTL_SECONDS", str(60 * 60 * 24)))
+
+    # Background plan generation (Celery)
+    PLAN_JOBS_ENABLED: bool = os.getenv("PLAN_JOBS_ENABLED", "false").lower() == "true"
+    PLAN_JOB_RESULT_TTL_SECONDS: int = int(os.getenv("PLAN_JOB_RESULT_TTL_SECONDS", str(60 * 60)))
+    PLAN_JOB_MAX_WAIT_SECONDS: int = int(os.getenv("PLAN_JOB_MAX_WAIT_SECONDS", "30"))
+    # How long a queued job may wait for a worker before its id stops resolving
+    PLAN_JOB_QUEUE_TTL_SECONDS: int = int(os.getenv("PLAN_JOB_QUEUE_TTL_SECONDS", str(60 * 60)))
+    CELERY_BROKER_URL: Optional[str] = os.getenv("CELERY_BROKER_URL")
+    CELERY_RESULT_BACKEND: Optional[str] = os.getenv("CELERY_RESULT_BACKEND")
+    # Run tasks in-process (local development and tests, no broker needed)
+    CELERY_TASK_ALWAYS_EAGER: bool = os.getenv("CELERY_TASK_ALWAYS_EAGER", "false").lower() == "true"
     
     class Config:
         case_sensitive = True
@@ -38,6 +141,13 @@ class Settings(BaseSettings):
     def __init__(self, **data: Any):
         super().__init__(**data)
         self.SQLALCHEMY_DATABASE_URI = f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}/{self.POSTGRES_DB}"
+        self.SQLALCHEMY_ASYNC_DATABASE_URI = f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}/{self.POSTGRES_DB}"
+        if self.CELERY_TASK_ALWAYS_EAGER:
+            self.CELERY_BROKER_URL = self.CELERY_BROKER_URL or "memory://"
+            self.CELERY_RESULT_BACKEND = self.CELERY_RESULT_BACKEND or "cache+memory://"
+        else:
+            self.CELERY_BROKER_URL = self.CELERY_BROKER_URL or f"redis://{self.REDIS_HOST}:{self.REDIS_PORT}/1"
+            self.CELERY_RESULT_BACKEND = self.CELERY_RESULT_BACKEND or f"redis://{self.REDIS_HOST}:{self.REDIS_PORT}/2"
 
 
 settings = Settings() 
\ No newline at end of file
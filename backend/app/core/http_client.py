@@ -0,0 +1,52 @@
+from typing import Optional
+
+import httpx
+
+from app.core import metrics
+from app.core.config import settings
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def create_client() -> httpx.AsyncClient:
+    """
+    Creates an AsyncClient configured from settings. Callers own the result
+    and must close it; the application-wide instance lives in get_client().
+    """
+    limits = httpx.Limits(
+        max_connections=settings.GEMINI_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.GEMINI_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.GEMINI_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(
+        connect=settings.GEMINI_CONNECT_TIMEOUT,
+        read=settings.GEMINI_READ_TIMEOUT,
+        write=settings.GEMINI_WRITE_TIMEOUT,
+        pool=settings.GEMINI_POOL_TIMEOUT,
+    )
+    metrics.GEMINI_HTTP_POOL_SIZE.set(settings.GEMINI_MAX_CONNECTIONS)
+    return httpx.AsyncClient(http2=settings.GEMINI_HTTP2, limits=limits, timeout=timeout)
+
+
+async def startup() -> None:
+    global _client
+    if _client is None:
+        _client = create_client()
+
+
+async def shutdown() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """
+    Returns the shared client, creating it lazily when the app startup hook
+    has not run (scripts, shell sessions).
+    """
+    global _client
+    if _client is None:
+        _client = create_client()
+    return _client
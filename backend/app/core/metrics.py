@@ -0,0 +1,115 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+# Gemini HTTP pool
+GEMINI_HTTP_POOL_SIZE = Gauge(
+    "gemini_http_pool_max_connections",
+    "Maximum number of connections in the shared Gemini HTTP pool",
+)
+GEMINI_HTTP_IN_FLIGHT = Gauge(
+    "gemini_http_requests_in_flight",
+    "Gemini HTTP requests currently holding a pool connection",
+)
+GEMINI_HTTP_POOL_TIMEOUTS = Counter(
+    "gemini_http_pool_timeouts_total",
+    "Gemini HTTP requests that timed out waiting for a free pool connection",
+)
+GEMINI_RETRIES = Counter(
+    "gemini_retries_total",
+    "Gemini requests retried, by reason (HTTP status or transport error)",
+    ["reason"],
+)
+GEMINI_LIMITER_WAIT = Histogram(
+    "gemini_limiter_wait_seconds",
+    "Time spent waiting for a Gemini concurrency slot or rate-limit token",
+    ["kind"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+GEMINI_CIRCUIT_OPEN = Gauge(
+    "gemini_circuit_open",
+    "1 while the Gemini circuit breaker is open (calls fail fast)",
+)
+GEMINI_CIRCUIT_REJECTIONS = Counter(
+    "gemini_circuit_rejections_total",
+    "Gemini calls rejected without being sent because the circuit was open",
+)
+GEMINI_TOKENS = Counter(
+    "gemini_tokens_total",
+    "Tokens reported by Gemini usageMetadata, by kind (prompt, candidates, thoughts, total)",
+    ["kind"],
+)
+GEMINI_CALL_TOKENS = Histogram(
+    "gemini_call_tokens",
+    "Tokens per Gemini call, by kind",
+    ["kind"],
+    buckets=(100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000),
+)
+
+# Plan cache
+PLAN_CACHE_HITS = Counter("plan_cache_hits_total", "Generated plans served from the plan cache")
+PLAN_CACHE_MISSES = Counter("plan_cache_misses_total", "Plan cache lookups that fell through to Gemini")
+PLAN_CACHE_EVICTIONS = Counter("plan_cache_evictions_total", "Plan cache entries evicted by the LRU size cap")
+
+# SQLAlchemy connection pools, labelled by engine ("sync" / "async")
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection, including opening a new one",
+    ["engine"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+DB_POOL_TIMEOUTS = Counter(
+    "db_pool_timeouts_total",
+    "Checkouts that failed with a QueuePool limit timeout",
+    ["engine"],
+)
+DB_POOL_SIZE = Gauge("db_pool_size", "Configured pool size", ["engine"])
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Connections currently checked out", ["engine"])
+DB_POOL_OVERFLOW = Gauge("db_pool_overflow", "Connections currently open beyond pool_size", ["engine"])
+
+# HTTP requests, labelled by route template so path parameters do not explode cardinality
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests by method, route and status code",
+    ["method", "route", "status"],
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time until the response body is fully sent, by method and route",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge("http_requests_in_progress", "HTTP requests currently being served")
+
+# SQL statements
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Duration of single SQL statements (cursor execute), by engine",
+    ["engine"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+DB_REQUEST_QUERIES = Histogram(
+    "db_queries_per_request",
+    "SQL statements executed while serving one HTTP request, by route",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+)
+DB_REQUEST_QUERY_TIME = Histogram(
+    "db_query_seconds_per_request",
+    "Total SQL time while serving one HTTP request, by route",
+    ["method", "route"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+# Gemini calls end to end (limiter waits and retries included)
+GEMINI_REQUEST_DURATION = Histogram(
+    "gemini_request_duration_seconds",
+    "Gemini call duration by method (generate, stream) and outcome (ok, error)",
+    ["method", "outcome"],
+    buckets=(0.5, 1, 2.5, 5, 10, 20, 30, 45, 60, 90, 120),
+)
+
+# Response cache (app.services.response_cache)
+RESPONSE_CACHE_LOOKUPS = Counter(
+    "response_cache_lookups_total",
+    "Response cache lookups by result (local, redis, miss)",
+    ["result"],
+)
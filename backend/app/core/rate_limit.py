@@ -0,0 +1,181 @@
+import math
+import threading
+import time
+from typing import Dict, Tuple
+
+from fastapi import HTTPException, Request, status
+from jose import JWTError, jwt
+from redis.exceptions import RedisError
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.redis import get_async_redis
+
+KEY_PREFIX = "rate_limit:"
+# request.state attribute read by RateLimitHeadersMiddleware
+STATE_KEY = "rate_limit_headers"
+
+# Sliding window counter: the previous fixed window's count is weighted by
+# how much of it still overlaps the sliding window. Returns
+# {allowed, count after this request, seconds until the current window ends}.
+SLIDING_WINDOW_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local current = math.floor(now / window)
+local current_key = KEYS[1] .. ':' .. current
+local previous = tonumber(redis.call('GET', KEYS[1] .. ':' .. (current - 1)) or '0')
+local count = tonumber(redis.call('GET', current_key) or '0')
+local elapsed = now - current * window
+local weighted = previous * (window - elapsed) / window + count
+if weighted + 1 > limit then
+    return {0, tostring(weighted), tostring(window - elapsed)}
+end
+redis.call('INCR', current_key)
+redis.call('EXPIRE', current_key, window * 2)
+return {1, tostring(weighted + 1), tostring(window - elapsed)}
+"""
+
+
+class MemorySlidingWindow:
+    """
+    Same algorithm as SLIDING_WINDOW_SCRIPT, per process. For tests and
+    single-process development.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counts: Dict[Tuple[str, int, int], int] = {}
+        # window length -> last window index pruned for it
+        self._pruned: Dict[int, int] = {}
+
+    def _prune(self, window: int, current: int) -> None:
+        # Once per window: drop windows that can no longer contribute
+        if self._pruned.get(window) == current:
+            return
+        self._pruned[window] = current
+        for stale in [k for k in self._counts if k[1] == window and k[2] < current - 1]:
+            del self._counts[stale]
+
+    async def hit(self, key: str, limit: int, window: int) -> Tuple[bool, float, float]:
+        now = time.time()
+        current = int(now // window)
+        elapsed = now - current * window
+        with self._lock:
+            self._prune(window, current)
+            previous = self._counts.get((key, window, current - 1), 0)
+            count = self._counts.get((key, window, current), 0)
+            weighted = previous * (window - elapsed) / window + count
+            if weighted + 1 > limit:
+                return False, weighted, window - elapsed
+            self._counts[(key, window, current)] = count + 1
+            return True, weighted + 1, window - elapsed
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+
+class RedisSlidingWindow:
+    async def hit(self, key: str, limit: int, window: int) -> Tuple[bool, float, float]:
+        allowed, count, reset = await get_async_redis().eval(SLIDING_WINDOW_SCRIPT, 1, key, limit, window)
+        return bool(allowed), float(count), float(reset)
+
+
+memory_backend = MemorySlidingWindow()
+redis_backend = RedisSlidingWindow()
+
+
+def _client_identity(request: Request) -> str:
+    """
+    User id from a valid bearer token, otherwise the client IP.
+    """
+    authorization = request.headers.get("Authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+            if payload.get("sub"):
+                return f"user:{payload['sub']}"
+        except JWTError:
+            pass
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+class RateLimit:
+    """
+    Route dependency enforcing `limit` requests per `window` seconds for each
+    client (user id from the JWT, otherwise IP), counted per route.
+
+    Answers 429 with Retry-After when exceeded. The RateLimit-Limit /
+    RateLimit-Remaining / RateLimit-Reset / RateLimit-Policy headers are kept
+    on request.state and added by RateLimitHeadersMiddleware, so they also
+    reach responses the endpoint builds itself (JSON, SSE, 304).
+    """
+
+    def __init__(self, name: str, limit: int, window: int, by_ip: bool = False):
+        self.name = name
+        self.limit = limit
+        self.window = window
+        self.by_ip = by_ip
+
+    async def __call__(self, request: Request) -> None:
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+
+        if self.by_ip:
+            identity = f"ip:{request.client.host if request.client else 'unknown'}"
+        else:
+            identity = _client_identity(request)
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", request.url.path)
+        key = f"{KEY_PREFIX}{self.name}:{request.method}:{route_path}:{identity}"
+
+        backend = redis_backend if settings.RATE_LIMIT_BACKEND == "redis" else memory_backend
+        try:
+            allowed, count, reset = await backend.hit(key, self.limit, self.window)
+        except RedisError:
+            # Fail open: an unavailable Redis must not take the API down
+            return
+
+        headers = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(max(self.limit - math.ceil(count), 0)),
+            "RateLimit-Reset": str(math.ceil(reset)),
+            "RateLimit-Policy": f"{self.limit};w={self.window}",
+        }
+        if not allowed:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Rate limit exceeded",
+                headers={**headers, "Retry-After": str(math.ceil(reset))},
+            )
+        setattr(request.state, STATE_KEY, headers)
+
+
+class RateLimitHeadersMiddleware:
+    """
+    Adds the headers stored by RateLimit to whatever response is sent.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = scope.get("state", {}).get(STATE_KEY)
+                if headers:
+                    response_headers = MutableHeaders(scope=message)
+                    for name, value in headers.items():
+                        if name not in response_headers:
+                            response_headers[name] = value
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
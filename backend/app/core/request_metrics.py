@@ -0,0 +1,94 @@
+"""
+Per-request Prometheus metrics: latency and status by route, plus the number
+of SQL statements and the time spent in them while serving the request.
+"""
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import metrics
+
+
+class QueryStats:
+    """
+    SQL totals of one request. Shared by reference with the threadpool and
+    with concurrently loaded sections, hence the lock.
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.seconds += seconds
+
+
+_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def record_query(engine: str, seconds: float) -> None:
+    metrics.DB_QUERY_DURATION.labels(engine).observe(seconds)
+    stats = _query_stats.get()
+    if stats is not None:
+        stats.add(seconds)
+
+
+def _route_path(scope: Scope) -> str:
+    # FastAPI routes store themselves in the scope; plain Starlette routes
+    # (docs, openapi.json, redirects) do not, so look those up again
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    router = getattr(scope.get("app"), "router", None)
+    for candidate in getattr(router, "routes", ()):
+        match, _ = candidate.matches(scope)
+        if match == Match.FULL:
+            return getattr(candidate, "path", "unmatched")
+    return "unmatched"
+
+
+class PrometheusMiddleware:
+    """
+    Pure ASGI middleware, so streamed (SSE) responses are timed until the
+    last chunk is sent. Requests that match no route share one label.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        stats = QueryStats()
+        token = _query_stats.set(stats)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        metrics.HTTP_REQUESTS_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.HTTP_REQUESTS_IN_PROGRESS.dec()
+            _query_stats.reset(token)
+            route = _route_path(scope)
+            method = scope["method"]
+            metrics.HTTP_REQUESTS.labels(method, route, str(status_code)).inc()
+            metrics.HTTP_REQUEST_DURATION.labels(method, route).observe(elapsed)
+            metrics.DB_REQUEST_QUERIES.labels(method, route).observe(stats.count)
+            metrics.DB_REQUEST_QUERY_TIME.labels(method, route).observe(stats.seconds)
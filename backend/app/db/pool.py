@@ -0,0 +1,75 @@
+import time
+from typing import Any, Dict
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core import metrics, request_metrics
+from app.core.config import settings
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool that records how long each checkout waits for a connection.
+    """
+    metrics_label = "sync"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            metrics.DB_POOL_TIMEOUTS.labels(self.metrics_label).inc()
+            raise
+        finally:
+            metrics.DB_POOL_CHECKOUT_WAIT.labels(self.metrics_label).observe(time.perf_counter() - start)
+
+
+class InstrumentedAsyncAdaptedQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    metrics_label = "async"
+
+
+def engine_kwargs(asyncpg: bool = False) -> Dict[str, Any]:
+    """
+    Pool settings shared by the sync (psycopg2) and async (asyncpg) engines.
+    """
+    kwargs: Dict[str, Any] = {
+        "poolclass": InstrumentedAsyncAdaptedQueuePool if asyncpg else InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if settings.DB_STATEMENT_TIMEOUT_MS > 0:
+        timeout = str(settings.DB_STATEMENT_TIMEOUT_MS)
+        if asyncpg:
+            kwargs["connect_args"] = {"server_settings": {"statement_timeout": timeout}}
+        else:
+            kwargs["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    return kwargs
+
+
+def register_pool_metrics(engine: Engine, label: str) -> None:
+    """
+    Exposes live pool state as gauges, read at scrape time. engine.pool is
+    looked up on every read because dispose() replaces the pool object.
+    """
+    metrics.DB_POOL_SIZE.labels(label).set_function(lambda: engine.pool.size())
+    metrics.DB_POOL_CHECKED_OUT.labels(label).set_function(lambda: engine.pool.checkedout())
+    metrics.DB_POOL_OVERFLOW.labels(label).set_function(lambda: max(engine.pool.overflow(), 0))
+
+
+def register_query_metrics(engine: Engine, label: str) -> None:
+    """
+    Times every SQL statement; totals are also added to the current HTTP
+    request (see app.core.request_metrics).
+    """
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._query_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        request_metrics.record_query(label, time.perf_counter() - context._query_start)
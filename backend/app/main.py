@@ -1,13 +1,35 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.responses import RedirectResponse
+from fastapi.responses import ORJSONResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from starlette.responses import RedirectResponse, Response
 
 from app.api.api_v1.api import api_router
+from app.core import http_client, security
+from app.core.rate_limit import RateLimitHeadersMiddleware
+from app.core.request_metrics import PrometheusMiddleware
 from app.core.config import settings
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    await http_client.startup()
+    security.start_hash_executor()
+    try:
+        yield
+    finally:
+        await http_client.shutdown()
+        security.shutdown_hash_executor()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
 # Set all CORS enabled origins
@@ -17,8 +39,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "X-Next-Cursor",
+        "ETag",
+        "RateLimit-Limit",
+        "RateLimit-Remaining",
+        "RateLimit-Reset",
+        "RateLimit-Policy",
+        "Retry-After",
+    ],
 )
 
+app.add_middleware(RateLimitHeadersMiddleware)
+# Added last so it wraps everything, CORS included
+app.add_middleware(PrometheusMiddleware)
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
 
@@ -27,6 +62,11 @@ def root():
     return RedirectResponse(url="/docs")
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
@@ -1,4 +1,5 @@
-from sqlalchemy import Boolean, Column, String, Integer, Float, ForeignKey, Table, JSON, DateTime
+from sqlalchemy import Boolean, Column, String, Integer, Float, ForeignKey, Table, JSON, DateTime, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
@@ -13,6 +14,7 @@ class User(Base):
     name = Column(String)
     hashed_password = Column(String)
     role = Column(String, default="user")  # user, premium, admin
+    token_version = Column(Integer, default=0, server_default="0", nullable=False)  # bump to revoke issued tokens
     is_profile_complete = Column(Boolean, default=False)
     gender = Column(String, nullable=True)
     age = Column(Integer, nullable=True)
@@ -39,6 +41,10 @@ class Progress(Base):
     
     user = relationship("User", back_populates="progress")
 
+    __table_args__ = (
+        Index("ix_progress_user_id_date", "user_id", "date"),
+    )
+
 
 class Challenge(Base):
     __tablename__ = "challenges"
@@ -67,14 +73,43 @@ class WorkoutHistory(Base):
     
     user = relationship("User", back_populates="workout_history")
 
+    __table_args__ = (
+        Index("ix_workout_history_user_id_date", "user_id", "date"),
+    )
+
 
 class Plan(Base):
     __tablename__ = "plans"
     
     id = Column(String, primary_key=True, index=True, default=lambda: str(uuid.uuid4()))
     user_id = Column(String, ForeignKey("users.id"))
-    plan_data = Column(JSON)  # Stores the entire plan as JSON
+    plan_data = Column(JSONB)  # Stores the entire plan as JSON; NULL once archived
+    # Archived (inactive) plans: {section: {"hash": ..., "ids": [...]}} into plan_sections
+    section_refs = Column(JSONB, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     is_active = Column(Boolean, default=True)
+
+    __table_args__ = (
+        # At most one active plan per user; also serves get_current_plan
+        Index("ux_plans_user_id_active", "user_id", unique=True, postgresql_where=is_active),
+        # Containment (@>) searches over plan contents
+        Index("ix_plans_plan_data", "plan_data", postgresql_using="gin", postgresql_ops={"plan_data": "jsonb_path_ops"}),
+    )
     
-    user = relationship("User", back_populates="plans") 
\ No newline at end of file
+    user = relationship("User", back_populates="plans") 
+
+
+class PlanSection(Base):
+    """
+    Content-addressed plan section shared by all archived plans that contain it.
+    """
+    __tablename__ = "plan_sections"
+
+    hash = Column(String(64), primary_key=True)  # sha256 of the canonical JSON without ids
+    data = Column(JSONB, nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_plan_sections_data", "data", postgresql_using="gin", postgresql_ops={"data": "jsonb_path_ops"}),
+    )
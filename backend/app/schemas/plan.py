@@ -0,0 +1,94 @@
+import uuid
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+
+# Fields with defaults are filled in by the server and are not requested
+# from Gemini (see app.services.gemini_schema)
+
+
+def _new_id() -> str:
+    return str(uuid.uuid4())
+
+
+WeekDay = Literal["Понедельник", "Вторник", "Среда", "Четверг", "Пятница", "Суббота", "Воскресенье"]
+MealType = Literal["Завтрак", "Перекус 1", "Обед", "Перекус 2", "Ужин"]
+FitnessLevel = Literal["beginner", "intermediate", "advanced"]
+
+
+class Exercise(BaseModel):
+    day: WeekDay
+    name: str
+    sets: int
+    reps: str
+    description: str
+
+
+class FitnessPlan(BaseModel):
+    id: str = Field(default_factory=_new_id)
+    name: str
+    goal: Optional[str] = None
+    level: FitnessLevel
+    exercises: List[Exercise]
+    durationWeeks: int = 1
+
+
+class Ingredient(BaseModel):
+    name: str
+    amount: str = Field(description='Number and unit, e.g. "150 г", "200 мл", "2 шт"')
+
+
+class Macros(BaseModel):
+    protein: float
+    fat: float
+    carbs: float
+
+
+class Recipe(BaseModel):
+    id: str = Field(default_factory=_new_id)
+    mealType: MealType
+    title: str
+    ingredients: List[Ingredient]
+    macros: Macros
+    calories: float
+
+
+class MacroTargets(BaseModel):
+    protein: int
+    fat: int
+    carbs: int
+
+
+class DietPlan(BaseModel):
+    id: str = Field(default_factory=_new_id)
+    type: str = "balanced"
+    personalized: bool = True
+    caloriesPerDay: Optional[float] = None
+    macroTargets: Optional[MacroTargets] = None
+    recipes: List[Recipe]
+
+
+class Equipment(BaseModel):
+    name: str
+
+
+class ShoppingItem(BaseModel):
+    name: str
+    amount: str
+
+
+class GeneratedPlan(BaseModel):
+    """
+    The part of the plan produced by the model.
+    """
+    fitnessPlan: FitnessPlan
+    dietPlan: DietPlan
+    requiredEquipment: List[Equipment]
+
+
+class PlanData(GeneratedPlan):
+    """
+    A complete plan as stored and returned by the API.
+    """
+    shoppingList: List[ShoppingItem] = []
@@ -51,6 +51,34 @@ class Progress(ProgressBase):
         orm_mode = True
 
 
+class ProgressBucketSize(str, Enum):
+    day = "day"
+    week = "week"
+    month = "month"
+
+
+class ProgressPoint(BaseModel):
+    date: datetime
+    count: int
+    min_weight: float
+    max_weight: float
+    avg_weight: float
+    moving_avg_weight: float
+
+
+class ProgressSummary(BaseModel):
+    bucket: ProgressBucketSize
+    count: int
+    min_weight: Optional[float] = None
+    max_weight: Optional[float] = None
+    avg_weight: Optional[float] = None
+    first_weight: Optional[float] = None
+    last_weight: Optional[float] = None
+    # Least-squares slope of weight over time
+    trend_kg_per_week: Optional[float] = None
+    points: List[ProgressPoint] = []
+
+
 class ChallengeBase(BaseModel):
     type: ChallengeType
     title: str
@@ -89,6 +117,17 @@ class WorkoutHistory(WorkoutHistoryBase):
         orm_mode = True
 
 
+class PlanRecord(BaseModel):
+    id: str
+    user_id: str
+    created_at: datetime
+    is_active: bool
+    plan_data: Dict[str, Any]
+    
+    class Config:
+        orm_mode = True
+
+
 class UserBase(BaseModel):
     email: EmailStr
     name: str
@@ -129,6 +168,35 @@ class User(UserInDB):
     workout_history: List[WorkoutHistory] = []
 
 
+class PremiumUpgrade(User):
+    """
+    The upgraded user plus a token carrying the new role; tokens issued
+    before the upgrade are revoked.
+    """
+    access_token: str
+    token_type: str
+
+
+class DashboardSection(str, Enum):
+    profile = "profile"
+    plan = "plan"
+    challenges = "challenges"
+    progress = "progress"
+    workouts = "workouts"
+
+
+class Dashboard(BaseModel):
+    """
+    Only the requested sections are present; a requested section with no
+    data (e.g. no active plan) is null.
+    """
+    profile: Optional[UserInDB] = None
+    plan: Optional[Dict[str, Any]] = None
+    challenges: Optional[List[Challenge]] = None
+    progress: Optional[List[Progress]] = None
+    workouts: Optional[List[WorkoutHistory]] = None
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -136,4 +204,11 @@ class Token(BaseModel):
 
 class TokenPayload(BaseModel):
     sub: str
-    exp: int 
\ No newline at end of file
+    exp: int
+    role: Optional[UserRole] = None
+    ver: Optional[int] = None
+
+
+class Principal(BaseModel):
+    id: str
+    role: UserRole 
\ No newline at end of file
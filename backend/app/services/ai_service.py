@@ -1,40 +1,146 @@
+import copy
 import json
-from typing import Dict, Any, Optional
+import time
+from functools import lru_cache
+from typing import Dict, Any, Optional, AsyncIterator, Sequence, Tuple, Type
 import httpx
+from pydantic import BaseModel, TypeAdapter, ValidationError, create_model
+from app.core import http_client, metrics
 from app.core.config import settings
 from app.models.user import User
+from app.schemas.plan import GeneratedPlan
+from app.services import gemini_limits, gemini_schema, nutrition, plan_cache
+from app.services.json_sections import SectionParser
+from app.services.shopping_list import build_shopping_list
+
+PLAN_SECTIONS = ["fitnessPlan", "dietPlan", "requiredEquipment", "shoppingList"]
+# Секции, которые генерирует модель; shoppingList считается на сервере
+MODEL_SECTIONS = list(GeneratedPlan.model_fields)
+SECTION_ADAPTERS = {name: TypeAdapter(field.annotation) for name, field in GeneratedPlan.model_fields.items()}
+USAGE_KINDS = {
+    "promptTokenCount": "prompt",
+    "candidatesTokenCount": "candidates",
+    "thoughtsTokenCount": "thoughts",
+    "totalTokenCount": "total",
+}
+
+
+def record_usage(usage: Optional[Dict[str, Any]]) -> None:
+    """
+    Записывает usageMetadata ответа Gemini в метрики
+    """
+    for field, kind in USAGE_KINDS.items():
+        count = (usage or {}).get(field)
+        if count:
+            metrics.GEMINI_TOKENS.labels(kind).inc(count)
+            metrics.GEMINI_CALL_TOKENS.labels(kind).observe(count)
 
 class GeminiClient:
-    BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+    BASE_URL = settings.GEMINI_BASE_URL
     MODEL = "gemini-2.5-flash-preview-04-17"
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, client: Optional[httpx.AsyncClient] = None):
         self.api_key = api_key or settings.GEMINI_API_KEY
         if not self.api_key:
             raise ValueError("Gemini API key is not provided")
         
-        self.client = httpx.AsyncClient(
-            timeout=60.0,  # Увеличенный таймаут для генерации планов
-        )
+        # Общий пул соединений приложения (keep-alive, HTTP/2); не закрываем его здесь
+        self.client = client or http_client.get_client()
     
-    async def generate_content(self, prompt: str, temperature: float = 0.5, response_mime_type: str = "application/json") -> Dict[str, Any]:
+    async def generate_content(
+        self,
+        prompt: str,
+        temperature: float = 0.5,
+        response_mime_type: str = "application/json",
+        response_schema: Optional[Type[BaseModel]] = None,
+    ) -> Dict[str, Any]:
         """
-        Генерирует контент с помощью Gemini API
+        Генерирует контент с помощью Gemini API.
+        Запрос проходит через общий лимит конкурентности, token bucket,
+        circuit breaker и повторы с backoff (см. gemini_limits).
+        response_schema — Pydantic-модель структурированного ответа.
         """
         url = f"{self.BASE_URL}/models/{self.MODEL}:generateContent?key={self.api_key}"
+        payload = self._build_payload(prompt, temperature, response_mime_type, response_schema)
         
-        payload = {
-            "contents": [{"parts": [{"text": prompt}]}],
-            "generationConfig": {
-                "temperature": temperature,
-                "responseMimeType": response_mime_type,
-            }
-        }
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            async with gemini_limits.slot():
+                with metrics.GEMINI_HTTP_IN_FLIGHT.track_inprogress():
+                    response = await gemini_limits.send_with_retries(
+                        lambda: self.client.post(url, json=payload)
+                    )
+            outcome = "ok"
+        finally:
+            metrics.GEMINI_REQUEST_DURATION.labels("generate", outcome).observe(time.perf_counter() - start)
+        
+        data = response.json()
+        record_usage(data.get("usageMetadata"))
+        return data
+    
+    async def stream_content(
+        self,
+        prompt: str,
+        temperature: float = 0.5,
+        response_mime_type: str = "application/json",
+        response_schema: Optional[Type[BaseModel]] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Генерирует контент в потоковом режиме (streamGenerateContent, SSE),
+        отдавая текстовые фрагменты по мере их появления
+        """
+        url = f"{self.BASE_URL}/models/{self.MODEL}:streamGenerateContent?alt=sse&key={self.api_key}"
+        payload = self._build_payload(prompt, temperature, response_mime_type, response_schema)
         
-        response = await self.client.post(url, json=payload)
-        response.raise_for_status()
+        request = self.client.build_request("POST", url, json=payload)
         
-        return response.json()
+        # Длительность — до последнего фрагмента ответа
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            async with gemini_limits.slot():
+                with metrics.GEMINI_HTTP_IN_FLIGHT.track_inprogress():
+                    # Повторы возможны только до первого байта ответа
+                    response = await gemini_limits.send_with_retries(
+                        lambda: self.client.send(request, stream=True)
+                    )
+                    usage = None
+                    try:
+                        async for line in response.aiter_lines():
+                            if not line.startswith("data:"):
+                                continue
+                            chunk = json.loads(line[len("data:"):])
+                            # usageMetadata накопительный; берём из последнего фрагмента
+                            usage = chunk.get("usageMetadata") or usage
+                            candidates = chunk.get("candidates") or [{}]
+                            for part in candidates[0].get("content", {}).get("parts", []):
+                                if part.get("text"):
+                                    yield part["text"]
+                    finally:
+                        await response.aclose()
+                        record_usage(usage)
+            outcome = "ok"
+        finally:
+            metrics.GEMINI_REQUEST_DURATION.labels("stream", outcome).observe(time.perf_counter() - start)
+    
+    @staticmethod
+    def _build_payload(
+        prompt: str,
+        temperature: float,
+        response_mime_type: str,
+        response_schema: Optional[Type[BaseModel]] = None,
+    ) -> Dict[str, Any]:
+        generation_config: Dict[str, Any] = {
+            "temperature": temperature,
+            "responseMimeType": response_mime_type,
+        }
+        if response_schema is not None:
+            generation_config["responseSchema"] = gemini_schema.response_schema(response_schema)
+        return {
+            "contents": [{"parts": [{"text": prompt}]}],
+            "generationConfig": generation_config,
+        }
     
     async def create_chat(self, system_instruction: str, temperature: float = 0.8) -> Dict[str, Any]:
         """
@@ -49,92 +155,118 @@ class GeminiClient:
         }
 
 
-async def get_plan_prompt(user: User, goal: str) -> str:
+def _bucket(value: Optional[float], size: int) -> Optional[int]:
+    if not value:
+        return None
+    return int(round(value / size) * size)
+
+
+def _enum_value(value: Any) -> Any:
+    return getattr(value, "value", value)
+
+
+def get_plan_inputs(user: User, goal: str, last_weight: Optional[float]) -> Dict[str, Any]:
+    """
+    Входные данные промпта с точными значениями пользователя.
+    Последний вес передаётся явно (user_service.get_last_weight), чтобы не
+    подгружать всю историю progress ленивой загрузкой.
+    """
+    return {
+        "goal": _enum_value(goal),
+        "gender": _enum_value(user.gender),
+        "age": user.age,
+        "height": user.height,
+        "weight": last_weight,
+    }
+
+
+def get_plan_cache_key(plan_inputs: Dict[str, Any]) -> str:
+    """
+    Ключ кеша планов: возраст, рост и вес округляются по корзинам, чтобы
+    близкие профили делили один план. В промпт корзины не попадают.
+    """
+    return plan_cache.make_key({
+        **plan_inputs,
+        "age": _bucket(plan_inputs["age"], settings.PLAN_CACHE_AGE_BUCKET),
+        "height": _bucket(plan_inputs["height"], settings.PLAN_CACHE_HEIGHT_BUCKET),
+        "weight": _bucket(plan_inputs["weight"], settings.PLAN_CACHE_WEIGHT_BUCKET),
+    })
+
+
+async def get_plan_prompt(user: User, goal: str, last_weight: Optional[float]) -> str:
     """
     Формирует промпт для генерации плана тренировок и питания
     """
-    last_weight = None
-    if user.progress:
-        # Предполагаем, что progress отсортирован по дате
-        last_weight = user.progress[-1].weight
-    
+    return build_plan_prompt(get_plan_inputs(user, goal, last_weight))
+
+
+def get_plan_targets(user: User, goal: str, last_weight: Optional[float]) -> Optional[Dict[str, int]]:
+    """
+    Точные дневные нормы калорий и БЖУ пользователя (без округления по корзинам кеша)
+    """
+    return nutrition.compute_targets(user.gender, user.age, user.height, last_weight, goal)
+
+
+def build_plan_prompt(plan_inputs: Dict[str, Any]) -> str:
+    goal = plan_inputs["goal"]
     user_profile = f"""
 - Цель: "{goal}"
-- Пол: {user.gender or "не указан"}
-- Возраст: {user.age or "не указан"}
-- Рост: {user.height or "не указан"} см
-- Текущий вес: {last_weight or "не указан"} кг
+- Пол: {plan_inputs["gender"] or "не указан"}
+- Возраст: {plan_inputs["age"] or "не указан"}
+- Рост: {plan_inputs["height"] or "не указан"} см
+- Текущий вес: {plan_inputs["weight"] or "не указан"} кг
 """
+    # Нормы считаем сами; модель только подбирает рецепты под них
+    targets = nutrition.compute_targets(
+        plan_inputs["gender"], plan_inputs["age"], plan_inputs["height"], plan_inputs["weight"], goal
+    )
+    if targets:
+        user_profile += (
+            f"- Дневная норма: {targets['caloriesPerDay']} ккал; белки {targets['protein']} г, "
+            f"жиры {targets['fat']} г, углеводы {targets['carbs']} г\n"
+        )
 
-    prompt = f"""
-Ты — элитный AI-тренер и диетолог мирового класса для платформы USSR.Space. Твоя задача — создать комплексный, персонализированный и научно обоснованный план на 1 неделю, основываясь на данных пользователя.
-Твой ответ должен быть ИСКЛЮЧИТЕЛЬНО в формате одного валидного JSON-объекта, без какого-либо окружающего текста, пояснений или markdown-разметки (никаких \`\`\`json).
-Язык всего генерируемого контента (названия, описания и т.д.) должен быть РУССКИМ.
-
-Вот данные пользователя:
+    # Структуру ответа задаёт responseSchema (app.schemas.plan), поэтому здесь только данные и правила
+    prompt = f"""Ты — AI-тренер и диетолог USSR.Space. Составь персональный план на 1 неделю. Весь текст — на русском.
 {user_profile}
-
-JSON-объект должен строго соответствовать следующей структуре:
-{{
-  "fitnessPlan": {{
-    "id": "string", // сгенерируй UUID
-    "name": "string", // например, "Недельный план для набора массы"
-    "goal": "{goal}",
-    "level": "beginner",
-    "exercises": [ // Массив упражнений на неделю. 3-4 тренировочных дня. Учитывай данные пользователя.
-      {{
-        "day": "Понедельник" | "Среда" | "Пятница" | "Суббота",
-        "name": "string", "sets": "number", "reps": "string", "description": "string"
-      }}
-    ],
-    "durationWeeks": 1
-  }},
-  "dietPlan": {{
-    "id": "string", // сгенерируй UUID
-    "type": "balanced",
-    "personalized": true,
-    "caloriesPerDay": "number", // Рассчитай точное значение калорий для цели и данных пользователя (например, по формуле Харриса-Бенедикта).
-    "recipes": [ // Список рецептов на ОДИН день (3 основных, 2 перекуса).
-      {{
-        "id": "string", // сгенерируй UUID
-        "mealType": "Завтрак" | "Перекус 1" | "Обед" | "Перекус 2" | "Ужин",
-        "title": "string",
-        "ingredients": [ {{ "name": "string", "amount": "string" }} ],
-        "macros": {{ "protein": "number", "fat": "number", "carbs": "number" }},
-        "calories": "number"
-      }}
-    ]
-  }},
-  "requiredEquipment": [ // Список инвентаря для тренировок.
-    {{ "name": "string" }} // например, "Гантели", "Коврик для йоги"
-  ],
-  "shoppingList": [ // Агрегированный список продуктов для диеты на НЕДЕЛЮ. Суммируй все ингредиенты из рецептов и умножь на 7.
-    {{ "name": "string", "amount": "string" }} // например, "Куриная грудка", "700 г"
-  ]
-}}
-
-Важные замечания:
-- Если цель — 'diet_only', объект fitnessPlan всё равно должен быть возвращен, но с пустым массивом exercises, а requiredEquipment должен быть пустым.
-- Если для тренировок не нужен инвентарь, requiredEquipment должен быть пустым массивом.
-- Всегда предоставляй полный план питания и список покупок.
+- Тренировки: 3-4 дня в неделю с учётом данных пользователя. При цели diet_only — пустые exercises и requiredEquipment.
+- Питание: рецепты на ОДИН день — Завтрак, Перекус 1, Обед, Перекус 2, Ужин; в сумме они дают дневную норму калорий и БЖУ.
+- Количество ингредиентов — число и единица: "150 г", "200 мл", "2 шт".
+- requiredEquipment — только нужный инвентарь (пустой массив, если он не нужен).
 """
     return prompt
 
 
-async def generate_plan(user: User, goal: str) -> Dict[str, Any]:
+async def generate_plan(
+    user: User,
+    goal: str,
+    last_weight: Optional[float],
+    use_cache: bool = True,
+    client: Optional[httpx.AsyncClient] = None,
+) -> Dict[str, Any]:
     """
-    Генерирует план тренировок и питания с помощью Gemini API
+    Генерирует план тренировок и питания с помощью Gemini API.
+    Одинаковые нормализованные входные данные отдаются из кеша планов.
     """
     if not user.is_profile_complete:
         raise ValueError("User profile is not complete. Cannot generate a personalized plan.")
     
-    gemini_client = GeminiClient()
-    prompt = await get_plan_prompt(user, goal)
+    plan_inputs = get_plan_inputs(user, goal, last_weight)
+    targets = get_plan_targets(user, goal, last_weight)
+    cache_key = get_plan_cache_key(plan_inputs)
+    if use_cache:
+        cached_plan = await plan_cache.get(cache_key)
+        if cached_plan is not None:
+            return nutrition.apply_targets(cached_plan, targets)
+    
+    gemini_client = GeminiClient(client=client)
+    prompt = build_plan_prompt(plan_inputs)
     
     response = await gemini_client.generate_content(
         prompt=prompt,
         temperature=0.5,
-        response_mime_type="application/json"
+        response_mime_type="application/json",
+        response_schema=GeneratedPlan,
     )
     
     # Извлекаем JSON из ответа
@@ -147,21 +279,194 @@ async def generate_plan(user: User, goal: str) -> Dict[str, Any]:
     if not parts:
         raise ValueError("Empty response from Gemini API")
     
-    json_text = parts[0].get("text", "")
+    plan_data = parse_plan(parts[0].get("text", ""), goal=plan_inputs["goal"])
+    await plan_cache.put(cache_key, plan_data)
+    return nutrition.apply_targets(plan_data, targets)
+
+
+def parse_plan(json_text: str, goal: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Разбирает и строго проверяет JSON плана из ответа модели
+    """
+    try:
+        generated = GeneratedPlan.model_validate_json(json_text)
+    except ValidationError as e:
+        raise ValueError(f"Invalid plan received from API: {e}")
+    return complete_plan(generated, goal)
+
+
+def complete_plan(generated: GeneratedPlan, goal: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Дополняет ответ модели полями, которые считает сервер
+    """
+    if goal is not None:
+        generated.fitnessPlan.goal = goal
+    if generated.dietPlan.caloriesPerDay is None:
+        generated.dietPlan.caloriesPerDay = round(sum(recipe.calories for recipe in generated.dietPlan.recipes))
+    plan_data = generated.model_dump(mode="json")
+    # Список покупок на неделю считаем сами, а не просим у модели
+    plan_data["shoppingList"] = build_shopping_list(plan_data["dietPlan"])
+    return plan_data
+
+
+def parse_section(name: str, raw_value: str) -> Any:
+    """
+    Проверяет одну секцию потокового ответа; возвращает объект модели
+    """
+    try:
+        return SECTION_ADAPTERS[name].validate_json(raw_value)
+    except ValidationError as e:
+        raise ValueError(f"Invalid {name} received from API: {e}")
+
+
+async def stream_plan(
+    plan_inputs: Dict[str, Any],
+    use_cache: bool = True,
+    targets: Optional[Dict[str, int]] = None,
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Потоковая генерация плана. Отдаёт события:
+    ("token", текст), ("section", (имя, значение)) и в конце ("plan", план).
+    Нормы targets (get_plan_targets) подставляются в dietPlan.
+    """
+    cache_key = get_plan_cache_key(plan_inputs)
+    if use_cache:
+        cached_plan = await plan_cache.get(cache_key)
+        if cached_plan is not None:
+            nutrition.apply_targets(cached_plan, targets)
+            for name in PLAN_SECTIONS:
+                yield "section", (name, cached_plan[name])
+            yield "plan", cached_plan
+            return
+    
+    gemini_client = GeminiClient()
+    parser = SectionParser()
+    sections: Dict[str, Any] = {}
+    async for text in gemini_client.stream_content(
+        prompt=build_plan_prompt(plan_inputs),
+        temperature=0.5,
+        response_mime_type="application/json",
+        response_schema=GeneratedPlan,
+    ):
+        yield "token", text
+        for name, raw_value in parser.feed(text):
+            if name not in SECTION_ADAPTERS:
+                continue
+            # Проверенные секции (с выданными id) потом собираются в итоговый план
+            sections[name] = parse_section(name, raw_value)
+            value = SECTION_ADAPTERS[name].dump_python(sections[name], mode="json")
+            if name == "fitnessPlan":
+                value["goal"] = plan_inputs["goal"]
+            if name == "dietPlan":
+                nutrition.apply_targets({"dietPlan": value}, targets)
+            yield "section", (name, value)
     
-    # Удаляем возможные маркеры кода
-    json_text = json_text.replace("```json", "").replace("```", "").strip()
+    try:
+        generated = GeneratedPlan(**sections)
+    except ValidationError as e:
+        raise ValueError(f"Invalid plan received from API: {e}")
+    plan_data = complete_plan(generated, goal=plan_inputs["goal"])
+    yield "section", ("shoppingList", plan_data["shoppingList"])
+    await plan_cache.put(cache_key, plan_data)
+    yield "plan", nutrition.apply_targets(plan_data, targets)
+
+
+@lru_cache(maxsize=None)
+def _partial_plan_model(sections: Tuple[str, ...]) -> Type[BaseModel]:
+    """
+    Модель ответа только с перегенерируемыми секциями
+    """
+    fields = {name: (GeneratedPlan.model_fields[name].annotation, ...) for name in sections}
+    return create_model("PartialPlan", **fields)
+
+
+def _section_context(name: str, value: Any) -> Any:
+    """
+    Сжатое описание неизменной секции: только то, что нужно для согласованности
+    """
+    if name == "fitnessPlan" and isinstance(value, dict):
+        return {
+            "name": value.get("name"),
+            "level": value.get("level"),
+            "exercises": [f"{e.get('day')}: {e.get('name')}" for e in value.get("exercises") or []],
+        }
+    if name == "dietPlan" and isinstance(value, dict):
+        return {
+            "caloriesPerDay": value.get("caloriesPerDay"),
+            "recipes": [f"{r.get('mealType')}: {r.get('title')}" for r in value.get("recipes") or []],
+        }
+    if name == "requiredEquipment" and isinstance(value, list):
+        return [item.get("name") for item in value if isinstance(item, dict)]
+    return value
+
+
+def _sections_valid(plan_data: Dict[str, Any], names: Sequence[str]) -> bool:
+    try:
+        for name in names:
+            SECTION_ADAPTERS[name].validate_python(plan_data[name])
+    except (KeyError, ValidationError):
+        return False
+    return True
+
+
+async def regenerate_sections(
+    user: User,
+    goal: str,
+    last_weight: Optional[float],
+    plan_data: Dict[str, Any],
+    sections: Sequence[str],
+    client: Optional[httpx.AsyncClient] = None,
+) -> Dict[str, Any]:
+    """
+    Перегенерирует только указанные секции плана; остальные передаются
+    модели как краткий контекст и переносятся в новый план без изменений.
+    Если сохранённые секции не проходят схему GeneratedPlan (планы старого
+    формата), план составляется заново целиком.
+    """
+    if not user.is_profile_complete:
+        raise ValueError("User profile is not complete. Cannot generate a personalized plan.")
+    sections = tuple(name for name in MODEL_SECTIONS if name in sections)
+    if not sections:
+        raise ValueError(f"Nothing to regenerate; sections must be among {', '.join(MODEL_SECTIONS)}")
+    if not _sections_valid(plan_data, [name for name in MODEL_SECTIONS if name not in sections]):
+        return await generate_plan(user, goal, last_weight, use_cache=False, client=client)
     
+    plan_inputs = get_plan_inputs(user, goal, last_weight)
+    context = {
+        name: _section_context(name, plan_data.get(name))
+        for name in MODEL_SECTIONS
+        if name not in sections and name in plan_data
+    }
+    prompt = build_plan_prompt(plan_inputs) + f"""
+Составь заново только: {", ".join(sections)}. Остальная часть текущего плана (для согласованности):
+{json.dumps(context, ensure_ascii=False, separators=(",", ":"))}
+"""
+    
+    response_model = _partial_plan_model(sections)
+    response = await GeminiClient(client=client).generate_content(
+        prompt=prompt,
+        temperature=0.5,
+        response_mime_type="application/json",
+        response_schema=response_model,
+    )
+    parts = (response.get("candidates") or [{}])[0].get("content", {}).get("parts", [])
+    if not parts:
+        raise ValueError("Empty response from Gemini API")
     try:
-        plan_data = json.loads(json_text)
-        
-        # Валидация структуры ответа
-        if not all(key in plan_data for key in ["fitnessPlan", "dietPlan", "requiredEquipment", "shoppingList"]):
-            raise ValueError("Invalid JSON structure received from API")
-        
-        return plan_data
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Failed to parse JSON response: {str(e)}")
+        partial = response_model.model_validate_json(parts[0].get("text", ""))
+    except ValidationError as e:
+        raise ValueError(f"Invalid plan received from API: {e}")
+    
+    merged = copy.deepcopy(plan_data)
+    for name in sections:
+        merged[name] = SECTION_ADAPTERS[name].dump_python(getattr(partial, name), mode="json")
+    try:
+        generated = GeneratedPlan.model_validate(merged)
+    except ValidationError as e:
+        raise ValueError(f"Stored plan cannot be merged: {e}")
+    
+    new_plan = complete_plan(generated, goal=plan_inputs["goal"])
+    return nutrition.apply_targets(new_plan, get_plan_targets(user, goal, last_weight))
 
 
 async def get_chat_system_instruction(plan_data: Dict[str, Any]) -> str:
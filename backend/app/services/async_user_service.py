@@ -0,0 +1,96 @@
+# Async counterparts of app.services.user_service for async endpoints.
+# With an AsyncSession the sync implementation runs via AsyncSession.run_sync
+# (every round-trip awaited on asyncpg); with a sync Session it runs in the
+# threadpool. The event loop is never blocked either way: Redis side effects
+# of the sync implementation are collected during run_sync and executed in
+# the threadpool afterwards.
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar, Union
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.user import User, Progress, Challenge, WorkoutHistory, Plan
+from app.schemas import user as user_schemas
+from app.services import user_service
+
+AnySession = Union[AsyncSession, Session]
+T = TypeVar("T")
+
+
+def _run_pending(pending: List[Tuple[Callable[..., Any], Tuple[Any, ...]]]) -> None:
+    for fn, args in pending:
+        fn(*args)
+
+
+async def _run(db: AnySession, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    if isinstance(db, AsyncSession):
+        pending: List[Tuple[Callable[..., Any], Tuple[Any, ...]]] = []
+        db.info[user_service.AFTER_COMMIT_KEY] = pending
+        try:
+            return await db.run_sync(fn, *args, **kwargs)
+        finally:
+            del db.info[user_service.AFTER_COMMIT_KEY]
+            if pending:
+                await run_in_threadpool(_run_pending, pending)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+
+async def get_user_by_email(db: AnySession, email: str) -> Optional[User]:
+    return await _run(db, user_service.get_user_by_email, email)
+
+
+async def get_user_by_id(db: AnySession, user_id: str) -> Optional[User]:
+    return await _run(db, user_service.get_user_by_id, user_id)
+
+
+async def create_user(db: AnySession, user_in: user_schemas.UserCreate, hashed_password: Optional[str] = None) -> User:
+    return await _run(db, user_service.create_user, user_in=user_in, hashed_password=hashed_password)
+
+
+async def set_password_hash(db: AnySession, user_id: str, hashed_password: str) -> None:
+    return await _run(db, user_service.set_password_hash, user_id=user_id, hashed_password=hashed_password)
+
+
+async def update_user(db: AnySession, user_id: str, user_in: user_schemas.UserUpdate) -> User:
+    return await _run(db, user_service.update_user, user_id=user_id, user_in=user_in)
+
+
+async def add_progress(db: AnySession, user_id: str, progress_in: user_schemas.ProgressCreate) -> Progress:
+    return await _run(db, user_service.add_progress, user_id=user_id, progress_in=progress_in)
+
+
+async def get_user_progress(db: AnySession, user_id: str, **filters: Any) -> List[Progress]:
+    return await _run(db, user_service.get_user_progress, user_id=user_id, **filters)
+
+
+async def get_last_weight(db: AnySession, user_id: str) -> Optional[float]:
+    return await _run(db, user_service.get_last_weight, user_id=user_id)
+
+
+async def toggle_challenge(db: AnySession, user_id: str, challenge_id: str) -> Challenge:
+    return await _run(db, user_service.toggle_challenge, user_id=user_id, challenge_id=challenge_id)
+
+
+async def add_workout_history(db: AnySession, user_id: str, workout_in: user_schemas.WorkoutHistoryCreate) -> WorkoutHistory:
+    return await _run(db, user_service.add_workout_history, user_id=user_id, workout_in=workout_in)
+
+
+async def get_workout_history(db: AnySession, user_id: str, **filters: Any) -> List[WorkoutHistory]:
+    return await _run(db, user_service.get_workout_history, user_id=user_id, **filters)
+
+
+async def save_plan(db: AnySession, user_id: str, plan_data: Dict[str, Any]) -> Plan:
+    return await _run(db, user_service.save_plan, user_id=user_id, plan_data=plan_data)
+
+
+async def get_current_plan(db: AnySession, user_id: str) -> Optional[Plan]:
+    return await _run(db, user_service.get_current_plan, user_id=user_id)
+
+
+async def revoke_tokens(db: AnySession, user_id: str) -> User:
+    return await _run(db, user_service.revoke_tokens, user_id=user_id)
+
+
+async def upgrade_to_premium(db: AnySession, user_id: str) -> User:
+    return await _run(db, user_service.upgrade_to_premium, user_id=user_id)
@@ -0,0 +1,78 @@
+"""
+/users/me/dashboard: everything the dashboard page mounts, in one response.
+
+Each section is loaded in the threadpool with its own session, so the
+queries run concurrently on separate pool connections. Sections are
+serialized where they are loaded and the stored plan JSON is embedded as
+is; the response body is assembled from the serialized parts.
+"""
+import asyncio
+from typing import Callable, Dict, List, Optional
+
+import orjson
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from app.db.base import SessionLocal
+from app.schemas import user as user_schemas
+from app.schemas.user import DashboardSection
+from app.services import response_cache, user_service
+
+
+def _profile(db: Session, user_id: str, limit: int) -> Optional[bytes]:
+    user = user_service.get_user_by_id_cached(db, user_id)
+    if user is None:
+        return None
+    return response_cache.serialize(user, user_schemas.UserInDB)
+
+
+def _plan(db: Session, user_id: str, limit: int) -> Optional[bytes]:
+    plan_json = user_service.get_current_plan_json(db, user_id=user_id)
+    return plan_json.encode("utf-8") if plan_json is not None else None
+
+
+def _challenges(db: Session, user_id: str, limit: int) -> bytes:
+    return response_cache.serialize(
+        user_service.get_today_challenges(db, user_id), List[user_schemas.Challenge]
+    )
+
+
+def _progress(db: Session, user_id: str, limit: int) -> bytes:
+    return response_cache.serialize(
+        user_service.get_recent_progress(db, user_id, limit), List[user_schemas.Progress]
+    )
+
+
+def _workouts(db: Session, user_id: str, limit: int) -> bytes:
+    return response_cache.serialize(
+        user_service.get_workout_history(db, user_id, limit=limit), List[user_schemas.WorkoutHistory]
+    )
+
+
+LOADERS: Dict[DashboardSection, Callable[[Session, str, int], Optional[bytes]]] = {
+    DashboardSection.profile: _profile,
+    DashboardSection.plan: _plan,
+    DashboardSection.challenges: _challenges,
+    DashboardSection.progress: _progress,
+    DashboardSection.workouts: _workouts,
+}
+
+
+def _load(section: DashboardSection, user_id: str, limit: int) -> Optional[bytes]:
+    db = SessionLocal()
+    try:
+        return LOADERS[section](db, user_id, limit)
+    finally:
+        db.close()
+
+
+async def build_dashboard(user_id: str, sections: List[DashboardSection], limit: int) -> bytes:
+    """
+    Serialized dashboard with the requested sections, in request order.
+    """
+    sections = list(dict.fromkeys(sections))
+    bodies = await asyncio.gather(*(run_in_threadpool(_load, section, user_id, limit) for section in sections))
+    return b"{" + b",".join(
+        orjson.dumps(section.value) + b":" + (body if body is not None else b"null")
+        for section, body in zip(sections, bodies)
+    ) + b"}"
@@ -0,0 +1,293 @@
+import asyncio
+import random
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional
+
+import httpx
+from redis.exceptions import RedisError
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.redis import get_async_redis
+
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+SLOTS_KEY = "gemini:slots"
+BUCKET_KEY = "gemini:bucket"
+# Slot polling backs off from the first to the max interval (with jitter)
+POLL_INTERVAL_SECONDS = 0.05
+POLL_INTERVAL_MAX_SECONDS = 1.0
+
+# Leases expire on their own so a crashed worker cannot hold a slot forever
+ACQUIRE_SLOT_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[2]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now + tonumber(ARGV[3]), ARGV[1])
+return 1
+"""
+
+# Token bucket; returns the seconds to wait for the next token ("0" = taken)
+TAKE_TOKEN_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens') or burst)
+local updated = tonumber(redis.call('HGET', KEYS[1], 'ts') or now)
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 60)
+return tostring(wait)
+"""
+
+
+class GeminiUnavailableError(Exception):
+    """
+    Raised without contacting Gemini: circuit open or no capacity in time.
+    """
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class MemoryLimiter:
+    """
+    Per-process concurrency limit and token bucket, used for tests and as a
+    fallback when Redis is unreachable.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._leases: Dict[str, float] = {}
+        self._tokens = float(settings.GEMINI_RATE_BURST)
+        self._updated = time.monotonic()
+
+    async def try_acquire_slot(self, lease_id: str, lease_seconds: float) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            self._leases = {lease: expiry for lease, expiry in self._leases.items() if expiry > now}
+            if len(self._leases) >= settings.GEMINI_MAX_CONCURRENCY:
+                return False
+            self._leases[lease_id] = now + lease_seconds
+            return True
+
+    async def release_slot(self, lease_id: str) -> None:
+        with self._lock:
+            self._leases.pop(lease_id, None)
+
+    async def take_token(self) -> float:
+        rate = settings.GEMINI_RATE_PER_MINUTE / 60
+        now = time.monotonic()
+        with self._lock:
+            self._tokens = min(settings.GEMINI_RATE_BURST, self._tokens + (now - self._updated) * rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / rate
+
+
+class RedisLimiter:
+    """
+    Cluster-wide limiter: the same limits apply across all API and Celery
+    workers. Falls back to the in-process limiter on Redis errors.
+    """
+
+    def __init__(self, fallback: MemoryLimiter) -> None:
+        self.fallback = fallback
+
+    async def try_acquire_slot(self, lease_id: str, lease_seconds: float) -> bool:
+        try:
+            acquired = await get_async_redis().eval(
+                ACQUIRE_SLOT_SCRIPT, 1, SLOTS_KEY, lease_id, settings.GEMINI_MAX_CONCURRENCY, lease_seconds
+            )
+            return bool(acquired)
+        except RedisError:
+            return await self.fallback.try_acquire_slot(lease_id, lease_seconds)
+
+    async def release_slot(self, lease_id: str) -> None:
+        await self.fallback.release_slot(lease_id)
+        try:
+            await get_async_redis().zrem(SLOTS_KEY, lease_id)
+        except RedisError:
+            pass
+
+    async def take_token(self) -> float:
+        try:
+            wait = await get_async_redis().eval(
+                TAKE_TOKEN_SCRIPT, 1, BUCKET_KEY, settings.GEMINI_RATE_PER_MINUTE / 60, settings.GEMINI_RATE_BURST
+            )
+            return float(wait)
+        except RedisError:
+            return await self.fallback.take_token()
+
+
+class CircuitBreaker:
+    """
+    Opens after GEMINI_BREAKER_FAILURE_THRESHOLD consecutive failures and
+    rejects calls for GEMINI_BREAKER_RESET_SECONDS; then lets one trial call
+    through (half-open) and closes again if it succeeds. State is per process.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self._opened_at is None:
+                return
+            elapsed = time.monotonic() - self._opened_at
+            if elapsed >= settings.GEMINI_BREAKER_RESET_SECONDS:
+                # Half-open: re-arm the timer so only this call goes through
+                self._opened_at = time.monotonic()
+                return
+        metrics.GEMINI_CIRCUIT_REJECTIONS.inc()
+        raise GeminiUnavailableError(
+            "Gemini API is temporarily unavailable",
+            retry_after=max(settings.GEMINI_BREAKER_RESET_SECONDS - elapsed, 1),
+        )
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+        metrics.GEMINI_CIRCUIT_OPEN.set(0)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._opened_at is not None or self._failures >= settings.GEMINI_BREAKER_FAILURE_THRESHOLD:
+                self._opened_at = time.monotonic()
+                metrics.GEMINI_CIRCUIT_OPEN.set(1)
+
+
+memory_limiter = MemoryLimiter()
+redis_limiter = RedisLimiter(fallback=memory_limiter)
+breaker = CircuitBreaker()
+
+
+def _limiter():
+    return redis_limiter if settings.GEMINI_LIMITER_BACKEND == "redis" else memory_limiter
+
+
+@asynccontextmanager
+async def slot() -> AsyncIterator[None]:
+    """
+    Holds one of GEMINI_MAX_CONCURRENCY cluster-wide slots for the duration
+    of a Gemini call, including reading a streamed response.
+    """
+    limiter = _limiter()
+    lease_id = uuid.uuid4().hex
+    lease_seconds = settings.GEMINI_READ_TIMEOUT * (settings.GEMINI_MAX_RETRIES + 1) + settings.GEMINI_BACKOFF_MAX
+    start = time.monotonic()
+    interval = POLL_INTERVAL_SECONDS
+    while not await limiter.try_acquire_slot(lease_id, lease_seconds):
+        remaining = settings.GEMINI_ACQUIRE_TIMEOUT - (time.monotonic() - start)
+        if remaining <= 0:
+            raise GeminiUnavailableError("Too many concurrent Gemini requests", retry_after=POLL_INTERVAL_MAX_SECONDS)
+        # Waiters spread out instead of hammering Redis in lockstep
+        await asyncio.sleep(min(random.uniform(interval / 2, interval), remaining))
+        interval = min(interval * 2, POLL_INTERVAL_MAX_SECONDS)
+    metrics.GEMINI_LIMITER_WAIT.labels("slot").observe(time.monotonic() - start)
+    try:
+        yield
+    finally:
+        await limiter.release_slot(lease_id)
+
+
+async def _wait_for_token() -> None:
+    limiter = _limiter()
+    start = time.monotonic()
+    while True:
+        wait = await limiter.take_token()
+        if wait <= 0:
+            break
+        if time.monotonic() - start + wait > settings.GEMINI_ACQUIRE_TIMEOUT:
+            raise GeminiUnavailableError("Gemini rate limit reached", retry_after=wait)
+        await asyncio.sleep(wait)
+    metrics.GEMINI_LIMITER_WAIT.labels("token").observe(time.monotonic() - start)
+
+
+def parse_retry_after(response: httpx.Response) -> Optional[float]:
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """
+    Exponential backoff with full jitter; never shorter than Retry-After.
+    """
+    delay = random.uniform(0, min(settings.GEMINI_BACKOFF_MAX, settings.GEMINI_BACKOFF_BASE * 2 ** attempt))
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, settings.GEMINI_BACKOFF_MAX))
+    return delay
+
+
+async def send_with_retries(send: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+    """
+    Sends a Gemini request through the circuit breaker and token bucket,
+    retrying 429/5xx responses and transport errors. Returns a successful
+    response (for streamed requests the body is still unread) or raises.
+    """
+    attempt = 0
+    while True:
+        breaker.before_call()
+        await _wait_for_token()
+        try:
+            response = await send()
+        except httpx.PoolTimeout:
+            # Our own connection pool is saturated; Gemini is not at fault,
+            # so this neither retries nor counts against the breaker
+            metrics.GEMINI_HTTP_POOL_TIMEOUTS.inc()
+            raise
+        except httpx.TransportError as e:
+            breaker.record_failure()
+            if attempt >= settings.GEMINI_MAX_RETRIES:
+                raise
+            metrics.GEMINI_RETRIES.labels(type(e).__name__).inc()
+            await asyncio.sleep(backoff_delay(attempt))
+            attempt += 1
+            continue
+
+        if response.status_code not in RETRYABLE_STATUS_CODES:
+            # 4xx other than 429 is our fault, not an upstream health problem
+            breaker.record_success()
+            if response.is_error:
+                await response.aread()
+                response.raise_for_status()
+            return response
+
+        breaker.record_failure()
+        if attempt >= settings.GEMINI_MAX_RETRIES:
+            await response.aread()
+            response.raise_for_status()
+        metrics.GEMINI_RETRIES.labels(str(response.status_code)).inc()
+        retry_after = parse_retry_after(response)
+        await response.aclose()
+        await asyncio.sleep(backoff_delay(attempt, retry_after))
+        attempt += 1
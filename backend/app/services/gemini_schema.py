@@ -0,0 +1,54 @@
+from functools import lru_cache
+from typing import Any, Dict, Type
+
+from pydantic import BaseModel
+
+_TYPES = {
+    "string": "STRING",
+    "number": "NUMBER",
+    "integer": "INTEGER",
+    "boolean": "BOOLEAN",
+}
+
+
+@lru_cache(maxsize=None)
+def response_schema(model: Type[BaseModel]) -> Dict[str, Any]:
+    """
+    Gemini responseSchema (OpenAPI subset) for a Pydantic model. Only
+    required fields are requested; fields with defaults are left for the
+    server to fill in.
+    """
+    schema = model.model_json_schema()
+    return _convert(schema, schema.get("$defs", {}))
+
+
+def _convert(node: Dict[str, Any], defs: Dict[str, Any]) -> Dict[str, Any]:
+    if "$ref" in node:
+        return _convert(defs[node["$ref"].rsplit("/", 1)[-1]], defs)
+
+    if "anyOf" in node:
+        # Optional[X] only: Gemini has no general unions
+        options = [option for option in node["anyOf"] if option.get("type") != "null"]
+        converted = _convert(options[0], defs)
+        if len(options) < len(node["anyOf"]):
+            converted["nullable"] = True
+        return converted
+
+    if "enum" in node or "const" in node:
+        converted = {"type": "STRING", "enum": [str(value) for value in node.get("enum", [node.get("const")])]}
+    elif node.get("type") == "object":
+        required = node.get("required", [])
+        converted = {
+            "type": "OBJECT",
+            "properties": {name: _convert(node["properties"][name], defs) for name in required},
+            "required": required,
+            "propertyOrdering": required,
+        }
+    elif node.get("type") == "array":
+        converted = {"type": "ARRAY", "items": _convert(node["items"], defs)}
+    else:
+        converted = {"type": _TYPES[node["type"]]}
+
+    if node.get("description"):
+        converted["description"] = node["description"]
+    return converted
@@ -0,0 +1,88 @@
+from typing import List, Optional, Tuple
+
+_WHITESPACE = " \t\r\n"
+
+
+class SectionParser:
+    """
+    Incremental scanner over a streamed JSON object that reports each
+    top-level member as soon as its value is complete.
+
+    feed() returns (key, raw_json_value) pairs; values are not decoded here.
+    Anything before the opening brace (e.g. a ```json fence) is skipped.
+    """
+
+    def __init__(self) -> None:
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._expect_key = True
+        self._key: Optional[str] = None
+        self._value_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, str]]:
+        self._buffer += chunk
+        completed: List[Tuple[str, str]] = []
+
+        buffer = self._buffer
+        for i in range(self._pos, len(buffer)):
+            char = buffer[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        if self._expect_key:
+                            self._key = buffer[self._string_start + 1:i]
+                        else:
+                            self._complete(completed, i + 1)
+                continue
+
+            if self._depth == 0:
+                if char == "{":
+                    self._depth = 1
+                continue
+
+            if self._depth == 1 and not self._expect_key and self._value_start is None and char not in _WHITESPACE:
+                self._value_start = i
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = i
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 1:
+                    self._complete(completed, i + 1)
+                elif self._depth == 0:
+                    # Closing the top-level object ends a trailing scalar value
+                    self._complete(completed, i)
+            elif self._depth == 1:
+                if char == ":":
+                    self._expect_key = False
+                    self._value_start = None
+                elif char == ",":
+                    self._complete(completed, i)
+                    self._expect_key = True
+
+        self._pos = len(buffer)
+        return completed
+
+    @property
+    def text(self) -> str:
+        return self._buffer
+
+    def _complete(self, completed: List[Tuple[str, str]], end: int) -> None:
+        if self._key is None or self._value_start is None:
+            return
+        completed.append((self._key, self._buffer[self._value_start:end].strip()))
+        self._key = None
+        self._value_start = None
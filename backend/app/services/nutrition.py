@@ -0,0 +1,175 @@
+"""
+Daily calorie and macro targets.
+
+BMR uses the revised Harris-Benedict equation (Roza & Shizgal, 1984), TDEE
+an activity factor for the plan's training load, and the calorie target a
+goal adjustment. Protein is set per kg of body weight, fat as a share of
+calories and carbohydrates take the rest. Everything is computed on NumPy
+arrays so the nightly job can recompute every active plan in one pass.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.dialects.postgresql import array
+from sqlalchemy.orm import Session
+
+from app.models.user import Plan, Progress, User
+from app.services import resource_versions
+
+KCAL_PER_G_PROTEIN = 4
+KCAL_PER_G_FAT = 9
+KCAL_PER_G_CARBS = 4
+
+# goal -> (activity factor, calorie adjustment, protein g/kg, fat share of calories)
+GOAL_FACTORS = {
+    "gain_mass": (1.55, 1.15, 2.0, 0.25),
+    "get_ripped": (1.55, 0.80, 2.2, 0.25),
+    "maintain": (1.55, 1.00, 1.6, 0.30),
+    "diet_only": (1.375, 0.85, 1.8, 0.30),
+}
+DEFAULT_GOAL = "maintain"
+
+
+def compute_targets_batch(
+    gender: Sequence[Optional[str]],
+    age: Sequence[Optional[float]],
+    height: Sequence[Optional[float]],
+    weight: Sequence[Optional[float]],
+    goal: Sequence[Optional[str]],
+) -> Dict[str, np.ndarray]:
+    """
+    Vectorized targets. Missing age/height/weight give NaN for that row;
+    an unknown gender uses the mean of the male and female equations.
+    """
+    age = np.array(age, dtype=float)
+    height = np.array(height, dtype=float)
+    weight = np.array(weight, dtype=float)
+    gender = np.array([str(getattr(g, "value", g)) for g in gender])
+    goal = [str(getattr(g, "value", g)) for g in goal]
+
+    male = 88.362 + 13.397 * weight + 4.799 * height - 5.677 * age
+    female = 447.593 + 9.247 * weight + 3.098 * height - 4.330 * age
+    bmr = np.select([gender == "male", gender == "female"], [male, female], default=(male + female) / 2)
+
+    factors = np.array([GOAL_FACTORS.get(g, GOAL_FACTORS[DEFAULT_GOAL]) for g in goal], dtype=float).reshape(-1, 4)
+    activity, adjustment, protein_per_kg, fat_share = factors.T
+
+    tdee = bmr * activity
+    calories = tdee * adjustment
+    protein = weight * protein_per_kg
+    fat = calories * fat_share / KCAL_PER_G_FAT
+    carbs = np.maximum(calories - protein * KCAL_PER_G_PROTEIN - fat * KCAL_PER_G_FAT, 0) / KCAL_PER_G_CARBS
+    return {
+        "bmr": bmr,
+        "tdee": tdee,
+        "caloriesPerDay": calories,
+        "protein": protein,
+        "fat": fat,
+        "carbs": carbs,
+    }
+
+
+def _row(targets: Dict[str, np.ndarray], i: int) -> Optional[Dict[str, int]]:
+    if np.isnan(targets["caloriesPerDay"][i]):
+        return None
+    return {name: int(round(float(values[i]))) for name, values in targets.items()}
+
+
+def compute_targets(
+    gender: Optional[str],
+    age: Optional[float],
+    height: Optional[float],
+    weight: Optional[float],
+    goal: Optional[str],
+) -> Optional[Dict[str, int]]:
+    """
+    Targets for one person, rounded; None when age, height or weight is unknown.
+    """
+    return _row(compute_targets_batch([gender], [age], [height], [weight], [goal]), 0)
+
+
+def apply_targets(plan_data: Dict[str, Any], targets: Optional[Dict[str, int]]) -> Dict[str, Any]:
+    """
+    Writes the targets into dietPlan (caloriesPerDay and macroTargets).
+    """
+    diet_plan = plan_data.get("dietPlan")
+    if targets is None or not isinstance(diet_plan, dict):
+        return plan_data
+    diet_plan["caloriesPerDay"] = targets["caloriesPerDay"]
+    diet_plan["macroTargets"] = {name: targets[name] for name in ("protein", "fat", "carbs")}
+    return plan_data
+
+
+def recompute_plan_targets(db: Session, batch_size: int = 1000) -> int:
+    """
+    Recomputes targets for every active plan from the current profile and
+    latest weight, and patches the plans whose targets changed, without
+    calling Gemini. Returns the number of plans updated.
+    """
+    latest_weight = (
+        select(Progress.weight)
+        .where(Progress.user_id == Plan.user_id)
+        .order_by(Progress.date.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    diet_plan = Plan.plan_data["dietPlan"]
+    patch = (
+        update(Plan)
+        .where(Plan.id == bindparam("plan_id"))
+        .values(plan_data=func.jsonb_set(
+            func.jsonb_set(Plan.plan_data, array(["dietPlan", "caloriesPerDay"]), func.to_jsonb(bindparam("calories"))),
+            array(["dietPlan", "macroTargets"]),
+            func.jsonb_build_object(
+                "protein", bindparam("protein"), "fat", bindparam("fat"), "carbs", bindparam("carbs")
+            ),
+        ))
+    )
+
+    updated = 0
+    last_id = ""
+    while True:
+        rows = db.execute(
+            select(
+                Plan.id,
+                User.gender,
+                User.age,
+                User.height,
+                latest_weight,
+                func.coalesce(Plan.plan_data["fitnessPlan"]["goal"].astext, User.current_goal),
+                diet_plan["caloriesPerDay"].astext,
+                diet_plan["macroTargets"],
+                Plan.user_id,
+            )
+            .join(User, User.id == Plan.user_id)
+            .where(Plan.is_active == True, Plan.plan_data.isnot(None), Plan.id > last_id)
+            .order_by(Plan.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        columns = list(zip(*rows))
+        targets = compute_targets_batch(*columns[1:6])
+        params: List[Dict[str, Any]] = []
+        changed_users: List[str] = []
+        for i, (plan_id, *_, old_calories, old_macros, user_id) in enumerate(rows):
+            row = _row(targets, i)
+            if row is None:
+                continue
+            macros = {name: row[name] for name in ("protein", "fat", "carbs")}
+            if old_calories == str(row["caloriesPerDay"]) and old_macros == macros:
+                continue
+            params.append({"plan_id": plan_id, "calories": row["caloriesPerDay"], **macros})
+            changed_users.append(user_id)
+
+        if params:
+            # Core executemany: through the Session, a list of parameters turns
+            # an ORM update into a bulk UPDATE by primary key
+            db.connection().execute(patch, params)
+            db.commit()
+            resource_versions.bump_many(changed_users, resource_versions.PLAN)
+            updated += len(params)
+    return updated
@@ -0,0 +1,32 @@
+import base64
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+
+def encode_cursor(date: datetime, item_id: str) -> str:
+    raw = f"{date.isoformat()}|{item_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """
+    Inverse of encode_cursor; raises ValueError on a malformed cursor.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        date, item_id = raw.split("|", 1)
+        return datetime.fromisoformat(date), item_id
+    except (UnicodeError, ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def paginate(items: Sequence[Any], limit: int) -> Tuple[List[Any], Optional[str]]:
+    """
+    Splits a query result fetched with limit + 1 rows into the page and the
+    cursor of the next one (None on the last page). Items need `date` and `id`.
+    """
+    page = list(items[:limit])
+    if len(items) <= limit or not page:
+        return page, None
+    last = page[-1]
+    return page, encode_cursor(last.date, last.id)
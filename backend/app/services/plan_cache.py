@@ -0,0 +1,80 @@
+import hashlib
+import json
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from redis.exceptions import RedisError
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.redis import get_async_redis
+
+KEY_PREFIX = "plan_cache:plan:"
+LRU_KEY = "plan_cache:lru"
+# Bump when the prompt or the plan format changes so old entries are not served
+FORMAT_VERSION = 6
+
+
+def make_key(plan_inputs: Dict[str, Any]) -> str:
+    """
+    Content address of a plan: hash of the normalized prompt inputs.
+    """
+    raw = json.dumps([FORMAT_VERSION, plan_inputs], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def refresh_ids(plan_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Issues new UUIDs so a cached plan never shares ids with another user's copy.
+    """
+    for section in ("fitnessPlan", "dietPlan"):
+        if isinstance(plan_data.get(section), dict):
+            plan_data[section]["id"] = str(uuid.uuid4())
+    for recipe in (plan_data.get("dietPlan") or {}).get("recipes") or []:
+        if isinstance(recipe, dict):
+            recipe["id"] = str(uuid.uuid4())
+    return plan_data
+
+
+async def get(key: str) -> Optional[Dict[str, Any]]:
+    if not settings.PLAN_CACHE_ENABLED:
+        return None
+    try:
+        redis = get_async_redis()
+        raw = await redis.get(KEY_PREFIX + key)
+        if raw is None:
+            metrics.PLAN_CACHE_MISSES.inc()
+            return None
+        await redis.zadd(LRU_KEY, {key: time.time()})
+    except RedisError:
+        # Кеш необязателен: при недоступности Redis идём в Gemini
+        metrics.PLAN_CACHE_MISSES.inc()
+        return None
+
+    metrics.PLAN_CACHE_HITS.inc()
+    return refresh_ids(json.loads(raw))
+
+
+async def put(key: str, plan_data: Dict[str, Any]) -> None:
+    if not settings.PLAN_CACHE_ENABLED:
+        return
+    now = time.time()
+    try:
+        redis = get_async_redis()
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.set(KEY_PREFIX + key, json.dumps(plan_data, ensure_ascii=False), ex=settings.PLAN_CACHE_TTL_SECONDS)
+            pipe.zadd(LRU_KEY, {key: now})
+            # Entries whose TTL has already expired only need their LRU slot dropped
+            pipe.zremrangebyscore(LRU_KEY, "-inf", now - settings.PLAN_CACHE_TTL_SECONDS)
+            pipe.zcard(LRU_KEY)
+            results = await pipe.execute()
+
+        overflow = results[-1] - settings.PLAN_CACHE_MAX_ENTRIES
+        if overflow > 0:
+            evicted = await redis.zpopmin(LRU_KEY, overflow)
+            if evicted:
+                await redis.delete(*(KEY_PREFIX + member.decode() for member, _ in evicted))
+                metrics.PLAN_CACHE_EVICTIONS.inc(len(evicted))
+    except RedisError:
+        pass
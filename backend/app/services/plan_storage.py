@@ -0,0 +1,126 @@
+"""
+Deduplicated storage for plan history.
+
+The active plan keeps its full JSON in plans.plan_data (it is read on every
+request and searched through the GIN index). When a plan is replaced it is
+archived: each top-level section is stored once in plan_sections, keyed by
+the hash of its canonical JSON, and the row keeps only the hashes. Plans
+served from the plan cache differ only by their UUIDs, so "id" values are
+taken out before hashing and kept on the plan row.
+"""
+import hashlib
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.models.user import Plan, PlanSection
+
+
+def canonical_json(value: Any) -> bytes:
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _strip_ids(value: Any, ids: List[Any]) -> Any:
+    # Dict keys are walked in sorted order: JSONB does not keep key order
+    if isinstance(value, dict):
+        stripped = {}
+        for key in sorted(value):
+            if key == "id":
+                ids.append(value[key])
+                stripped[key] = None
+            else:
+                stripped[key] = _strip_ids(value[key], ids)
+        return stripped
+    if isinstance(value, list):
+        return [_strip_ids(item, ids) for item in value]
+    return value
+
+
+def _restore_ids(value: Any, ids: Iterator[Any]) -> Any:
+    if isinstance(value, dict):
+        return {
+            key: next(ids) if key == "id" else _restore_ids(value[key], ids)
+            for key in sorted(value)
+        }
+    if isinstance(value, list):
+        return [_restore_ids(item, ids) for item in value]
+    return value
+
+
+def split_plan(plan_data: Dict[str, Any]) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Tuple[Any, int]]]:
+    """
+    Returns (section_refs, sections): the per-plan references and the
+    deduplicated section contents as {hash: (data, size_bytes)}.
+    """
+    refs: Dict[str, Dict[str, Any]] = {}
+    sections: Dict[str, Tuple[Any, int]] = {}
+    for name, value in plan_data.items():
+        ids: List[Any] = []
+        stripped = _strip_ids(value, ids)
+        raw = canonical_json(stripped)
+        digest = hashlib.sha256(raw).hexdigest()
+        refs[name] = {"hash": digest, "ids": ids}
+        sections[digest] = (stripped, len(raw))
+    return refs, sections
+
+
+def assemble_plan(section_refs: Dict[str, Dict[str, Any]], sections: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        name: _restore_ids(sections[ref["hash"]], iter(ref["ids"]))
+        for name, ref in section_refs.items()
+    }
+
+
+def store_sections(db: Session, sections: Dict[str, Tuple[Any, int]]) -> int:
+    """
+    Inserts sections that are not stored yet; returns the bytes actually added.
+    """
+    if not sections:
+        return 0
+    stmt = (
+        insert(PlanSection)
+        .values([
+            {"hash": digest, "data": data, "size_bytes": size}
+            for digest, (data, size) in sections.items()
+        ])
+        .on_conflict_do_nothing(index_elements=["hash"])
+        .returning(PlanSection.size_bytes)
+    )
+    return sum(db.execute(stmt).scalars())
+
+
+def archive_plan(db: Session, plan: Plan) -> int:
+    """
+    Moves an inactive plan's JSON into plan_sections, in the caller's
+    transaction. Returns the bytes added to plan_sections.
+    """
+    if plan.plan_data is None:
+        return 0
+    refs, sections = split_plan(plan.plan_data)
+    added = store_sections(db, sections)
+    plan.section_refs = refs
+    plan.plan_data = None
+    return added
+
+
+def load_sections(db: Session, hashes: Iterable[str]) -> Dict[str, Any]:
+    hashes = set(hashes)
+    if not hashes:
+        return {}
+    rows = db.query(PlanSection.hash, PlanSection.data).filter(PlanSection.hash.in_(hashes))
+    return {digest: data for digest, data in rows}
+
+
+def load_plan_data(db: Session, plans: List[Plan]) -> List[Optional[Dict[str, Any]]]:
+    """
+    Full plan JSON for each plan, reassembling archived ones with a single
+    query. Loaded values are attached without marking the rows dirty.
+    """
+    archived = [plan for plan in plans if plan.plan_data is None and plan.section_refs is not None]
+    sections = load_sections(db, (ref["hash"] for plan in archived for ref in plan.section_refs.values()))
+    for plan in archived:
+        set_committed_value(plan, "plan_data", assemble_plan(plan.section_refs, sections))
+    return [plan.plan_data for plan in plans]
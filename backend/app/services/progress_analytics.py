@@ -0,0 +1,128 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import extract, func, literal_column, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by, array_agg
+from sqlalchemy.orm import Session
+
+from app.models.user import Progress
+from app.schemas.user import ProgressBucketSize
+
+SECONDS_PER_WEEK = 7 * 24 * 60 * 60
+
+
+def lttb(points: Sequence[Dict[str, Any]], threshold: int, x_key: str, y_key: str) -> List[Dict[str, Any]]:
+    """
+    Largest-Triangle-Three-Buckets downsampling: keeps `threshold` points,
+    always including the first and the last, that best preserve the shape.
+    """
+    n = len(points)
+    if threshold >= n:
+        return list(points)
+    if threshold <= 2:
+        return [points[0], points[-1]]
+
+    xs = [points[i][x_key] for i in range(n)]
+    ys = [points[i][y_key] for i in range(n)]
+    sampled = [points[0]]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third triangle vertex
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = sum(xs[next_start:next_end]) / (next_end - next_start)
+        avg_y = sum(ys[next_start:next_end]) / (next_end - next_start)
+
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((xs[a] - avg_x) * (ys[j] - ys[a]) - (xs[a] - xs[j]) * (avg_y - ys[a]))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(points[best])
+        a = best
+    sampled.append(points[-1])
+    return sampled
+
+
+def get_progress_summary(
+    db: Session,
+    user_id: str,
+    bucket: ProgressBucketSize = ProgressBucketSize.day,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    points: int = 200,
+    window: int = 7,
+) -> Dict[str, Any]:
+    """
+    Aggregates weight history in SQL: per-bucket min/max/avg with a moving
+    average over `window` buckets, overall stats and the trend slope. The
+    bucket series is then downsampled to at most `points` points.
+    """
+    # Entries without a weight would make the aggregates NULL
+    filters = [Progress.user_id == user_id, Progress.weight.isnot(None)]
+    if date_from is not None:
+        filters.append(Progress.date >= date_from)
+    if date_to is not None:
+        filters.append(Progress.date < date_to)
+
+    overall = db.execute(
+        select(
+            func.count(Progress.id).label("count"),
+            func.min(Progress.weight).label("min_weight"),
+            func.max(Progress.weight).label("max_weight"),
+            func.avg(Progress.weight).label("avg_weight"),
+            func.regr_slope(Progress.weight, extract("epoch", Progress.date)).label("slope"),
+            array_agg(aggregate_order_by(Progress.weight, Progress.date.asc()))[1].label("first_weight"),
+            array_agg(aggregate_order_by(Progress.weight, Progress.date.desc()))[1].label("last_weight"),
+        ).where(*filters)
+    ).one()
+
+    summary: Dict[str, Any] = {"bucket": bucket, "count": overall.count, "points": []}
+    if not overall.count:
+        return summary
+
+    # Enum value is inlined so SELECT and GROUP BY render the identical expression
+    bucket_start = func.date_trunc(literal_column(f"'{ProgressBucketSize(bucket).value}'"), Progress.date).label("date")
+    avg_weight = func.avg(Progress.weight)
+    rows = db.execute(
+        select(
+            bucket_start,
+            func.count(Progress.id).label("count"),
+            func.min(Progress.weight).label("min_weight"),
+            func.max(Progress.weight).label("max_weight"),
+            avg_weight.label("avg_weight"),
+            func.avg(avg_weight).over(
+                order_by=bucket_start, rows=(-(window - 1), 0)
+            ).label("moving_avg_weight"),
+        ).where(*filters).group_by(bucket_start).order_by(bucket_start)
+    ).all()
+
+    series = [
+        {
+            "date": row.date,
+            "count": row.count,
+            "min_weight": row.min_weight,
+            "max_weight": row.max_weight,
+            "avg_weight": float(row.avg_weight),
+            "moving_avg_weight": float(row.moving_avg_weight),
+            "_x": row.date.timestamp(),
+        }
+        for row in rows
+    ]
+    series = lttb(series, points, "_x", "avg_weight")
+    for point in series:
+        point.pop("_x")
+
+    summary.update(
+        min_weight=overall.min_weight,
+        max_weight=overall.max_weight,
+        avg_weight=float(overall.avg_weight),
+        first_weight=overall.first_weight,
+        last_weight=overall.last_weight,
+        trend_kg_per_week=float(overall.slope) * SECONDS_PER_WEEK if overall.slope is not None else None,
+        points=series,
+    )
+    return summary
@@ -0,0 +1,108 @@
+"""
+Per-user version counters for cacheable resources.
+
+Every write to a resource bumps its version; readers derive ETags (and
+response cache keys) from the versions. A missing version starts from the
+current time in milliseconds and a bump never goes below it, so versions
+keep increasing even after Redis loses the hash: an old ETag can never
+match again.
+"""
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.redis import get_redis
+
+PROFILE = "profile"
+PLAN = "plan"
+PROGRESS = "progress"
+WORKOUTS = "workouts"
+CHALLENGES = "challenges"
+
+KEY_PREFIX = "resource_versions:"
+
+# KEYS[1] hash; ARGV[1] ttl, ARGV[2..] fields. Returns the versions,
+# initializing missing ones from the server clock
+GET_SCRIPT = """
+local t = redis.call('TIME')
+local now = t[1] * 1000 + math.floor(t[2] / 1000)
+local versions = {}
+for i = 2, #ARGV do
+    local v = redis.call('HGET', KEYS[1], ARGV[i])
+    if not v then
+        v = now
+        redis.call('HSET', KEYS[1], ARGV[i], v)
+    end
+    versions[#versions + 1] = tostring(v)
+end
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return versions
+"""
+
+BUMP_SCRIPT = """
+local t = redis.call('TIME')
+local now = t[1] * 1000 + math.floor(t[2] / 1000)
+for i = 2, #ARGV do
+    local v = tonumber(redis.call('HGET', KEYS[1], ARGV[i]) or '0') + 1
+    if v < now then
+        v = now
+    end
+    redis.call('HSET', KEYS[1], ARGV[i], v)
+end
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return 1
+"""
+
+_lock = threading.Lock()
+_local: Dict[str, Dict[str, int]] = {}
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def get_versions(user_id: str, resources: Sequence[str]) -> Optional[List[str]]:
+    """
+    Current versions of the user's resources, or None when they cannot be
+    read (callers then skip conditional responses and caching).
+    """
+    if settings.RESOURCE_VERSION_BACKEND == "memory":
+        with _lock:
+            versions = _local.setdefault(user_id, {})
+            return [str(versions.setdefault(resource, _now_ms())) for resource in resources]
+    try:
+        return [
+            v.decode() if isinstance(v, bytes) else str(v)
+            for v in get_redis().eval(
+                GET_SCRIPT, 1, KEY_PREFIX + user_id, settings.RESOURCE_VERSION_TTL_SECONDS, *resources
+            )
+        ]
+    except RedisError:
+        return None
+
+
+def bump(user_id: str, *resources: str) -> None:
+    """
+    Marks the resources as changed. Call after the write has committed.
+    """
+    if settings.RESOURCE_VERSION_BACKEND == "memory":
+        with _lock:
+            versions = _local.setdefault(user_id, {})
+            for resource in resources:
+                versions[resource] = max(versions.get(resource, 0) + 1, _now_ms())
+        return
+    try:
+        get_redis().eval(BUMP_SCRIPT, 1, KEY_PREFIX + user_id, settings.RESOURCE_VERSION_TTL_SECONDS, *resources)
+    except RedisError:
+        # Usually Redis is down for readers too and no ETags are issued; if it
+        # comes back without this bump, clients may keep a stale copy until
+        # the hash expires (RESOURCE_VERSION_TTL_SECONDS)
+        pass
+
+
+def bump_many(user_ids: Iterable[str], *resources: str) -> None:
+    for user_id in set(user_ids):
+        bump(user_id, *resources)
@@ -0,0 +1,145 @@
+"""
+Server-side cache of serialized GET responses.
+
+Entries are keyed by the ETag from deps.ConditionalGet, which already covers
+the route, query string, user and resource versions: a write bumps a version,
+so the next read misses and stale entries simply age out. Lookups go through
+a short-lived in-process LRU first, then Redis.
+"""
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import orjson
+from fastapi import Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter
+from redis.exceptions import RedisError
+
+from app.core import metrics
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.redis import get_redis
+
+KEY_PREFIX = "response_cache:"
+# Headers set by the endpoint that belong to the cached representation;
+# other headers on the injected response are per request and never cached
+CACHED_HEADERS = ("etag", "cache-control", "x-next-cursor")
+# Set by Response itself for the cached body
+BODY_HEADERS = ("content-length", "content-type")
+
+Entry = Tuple[Dict[str, str], bytes]
+
+_local = TTLCache(maxsize=settings.RESPONSE_CACHE_LOCAL_MAX_ENTRIES, ttl=settings.RESPONSE_CACHE_LOCAL_TTL_SECONDS)
+
+
+@lru_cache(maxsize=None)
+def _adapter(model: Any) -> TypeAdapter:
+    return TypeAdapter(model)
+
+
+def _encode(entry: Entry) -> bytes:
+    headers, body = entry
+    return orjson.dumps(headers) + b"\n" + body
+
+
+def _decode(raw: bytes) -> Entry:
+    headers, body = raw.split(b"\n", 1)
+    return orjson.loads(headers), body
+
+
+def load(key: str) -> Optional[Entry]:
+    entry = _local.get(key)
+    if entry is not None:
+        metrics.RESPONSE_CACHE_LOOKUPS.labels("local").inc()
+        return entry
+    raw = None
+    if settings.RESPONSE_CACHE_BACKEND == "redis":
+        try:
+            raw = get_redis().get(KEY_PREFIX + key)
+        except RedisError:
+            pass
+    if raw is None:
+        metrics.RESPONSE_CACHE_LOOKUPS.labels("miss").inc()
+        return None
+    metrics.RESPONSE_CACHE_LOOKUPS.labels("redis").inc()
+    entry = _decode(raw)
+    _local.set(key, entry)
+    return entry
+
+
+def store(key: str, entry: Entry, ttl: int) -> None:
+    if settings.RESPONSE_CACHE_BACKEND == "none":
+        return
+    _local.set(key, entry, ttl=min(ttl, settings.RESPONSE_CACHE_LOCAL_TTL_SECONDS))
+    if settings.RESPONSE_CACHE_BACKEND == "redis":
+        try:
+            get_redis().set(KEY_PREFIX + key, _encode(entry), ex=ttl)
+        except RedisError:
+            pass
+
+
+def serialize(value: Any, model: Any = None) -> bytes:
+    """
+    JSON body as FastAPI would render it for `model` (the route's response_model).
+    """
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, str):
+        return value.encode("utf-8")
+    if model is None:
+        return orjson.dumps(value)
+    adapter = _adapter(model)
+    return adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+
+
+def respond(
+    key: Optional[str],
+    ttl: int,
+    response: Response,
+    build: Callable[[], Any],
+    model: Any = None,
+) -> Response:
+    """
+    Serves the cached body for `key` (an ETag), or calls `build`, serializes
+    its result and caches it together with the representation headers the
+    endpoint set on `response`. All other headers on `response` are sent but
+    not cached. Without a key (versions unavailable) nothing is cached.
+    """
+    entry = load(key) if key is not None else None
+    if entry is None:
+        entry = _entry(response, serialize(build(), model))
+        if key is not None:
+            store(key, entry, ttl)
+    return _response(entry, response)
+
+
+async def respond_async(
+    key: Optional[str],
+    ttl: int,
+    response: Response,
+    build: Callable[[], Awaitable[bytes]],
+) -> Response:
+    """
+    respond() for async endpoints; `build` returns the serialized body.
+    """
+    entry = await run_in_threadpool(load, key) if key is not None else None
+    if entry is None:
+        entry = _entry(response, await build())
+        if key is not None:
+            await run_in_threadpool(store, key, entry, ttl)
+    return _response(entry, response)
+
+
+def _entry(response: Response, body: bytes) -> Entry:
+    return {name: value for name, value in response.headers.items() if name in CACHED_HEADERS}, body
+
+
+def _response(entry: Entry, response: Response) -> Response:
+    headers, body = entry
+    result = Response(content=body, media_type="application/json", headers=headers)
+    # Per-request headers from dependencies and the endpoint, duplicates (cookies) included
+    result.raw_headers.extend(
+        (name, value) for name, value in response.raw_headers
+        if name.decode("latin-1") not in CACHED_HEADERS + BODY_HEADERS
+    )
+    return result
@@ -0,0 +1,185 @@
+"""
+Weekly shopping list built from the plan's daily recipes.
+
+Ingredient amounts are free text written by the model ("200 г", "0,5 кг",
+"1/2 стакана", "2 шт", "по вкусу"). They are parsed into a quantity and a
+unit, converted to a base unit per dimension (grams, millilitres, pieces),
+summed per normalized ingredient name and scaled to the week.
+"""
+import re
+from collections import OrderedDict
+from fractions import Fraction
+from typing import Any, Dict, List, Optional, Tuple
+
+DAYS_PER_WEEK = 7
+
+MASS, VOLUME, PIECES = "g", "ml", "pcs"
+
+# unit spelling -> (dimension, factor to the base unit)
+UNITS: Dict[str, Tuple[str, float]] = {}
+for _names, _unit in (
+    (("г", "гр", "грамм", "грамма", "граммов", "g", "gr", "gram", "grams"), (MASS, 1)),
+    (("кг", "килограмм", "килограмма", "килограммов", "kg"), (MASS, 1000)),
+    (("мг", "mg"), (MASS, 0.001)),
+    (("мл", "миллилитр", "миллилитра", "миллилитров", "ml"), (VOLUME, 1)),
+    (("л", "литр", "литра", "литров", "l"), (VOLUME, 1000)),
+    (("ст.л", "ст.ложка", "ст.ложки", "ст.ложек", "столовая ложка", "столовые ложки", "столовых ложек", "tbsp"), (VOLUME, 15)),
+    (("ч.л", "ч.ложка", "ч.ложки", "ч.ложек", "чайная ложка", "чайные ложки", "чайных ложек", "tsp"), (VOLUME, 5)),
+    (("стакан", "стакана", "стаканов", "cup", "cups"), (VOLUME, 250)),
+    (("шт", "штука", "штуки", "штук", "pcs", "pc", "piece", "pieces"), (PIECES, 1)),
+):
+    for _name in _names:
+        UNITS[_name] = _unit
+
+_NUMBER = r"\d+(?:[.,]\d+)?(?:\s*/\s*\d+)?"
+# "1 1/2", "0,5", "1/2", and ranges like "1-2" (the upper bound is bought)
+_AMOUNT_RE = re.compile(
+    rf"^(?:(?P<whole>\d+)\s+(?=\d+\s*/))?(?P<number>{_NUMBER})(?:\s*[-–—]\s*(?P<upper>{_NUMBER}))?\s*(?P<unit>.*)$"
+)
+_PARENTHESES_RE = re.compile(r"\([^)]*\)")
+_SPACES_RE = re.compile(r"\s+")
+# Inflection endings, longest first; enough to merge "зубчик/зубчика/зубчиков"
+# and "яйцо/яйца" without a morphological dictionary
+_ENDINGS = (
+    "ями", "ами", "ого", "его", "ому", "ему", "ыми", "ими",
+    "ов", "ев", "ей", "ах", "ях", "ом", "ем", "ам", "ям", "ой", "ый", "ий", "ая", "яя", "ое", "ее",
+    "ые", "ие", "ых", "их", "ую", "юю",
+    "а", "я", "ы", "и", "у", "ю", "е", "о", "ь",
+)
+_ADJECTIVE_ENDINGS = ("ого", "его", "ой", "ый", "ий", "ая", "яя", "ое", "ее", "ые", "ие", "ых", "их", "ую", "юю")
+_MIN_STEM = 3
+
+
+def _to_number(text: str) -> float:
+    text = text.replace(",", ".").replace(" ", "")
+    return float(Fraction(text)) if "/" in text else float(text)
+
+
+def _stem(word: str) -> str:
+    for ending in _ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= _MIN_STEM:
+            word = word[:-len(ending)]
+            break
+    # Fleeting vowel: "пучок" / "пучка", "кусок" / "куска"
+    if word.endswith("ок") and len(word) > _MIN_STEM + 1:
+        word = word[:-2] + "к"
+    return word
+
+
+def _normalize_unit(text: str) -> str:
+    unit = text.strip().lower().rstrip(".")
+    # "ст. л." / "ст л" / "ч. л." -> "ст.л" / "ч.л"
+    return re.sub(r"^(ст|ч)\.?\s*(л|ложк[аи]|ложек)$", lambda m: f"{m.group(1)}.{m.group(2)}", unit)
+
+
+def _parse_unit(text: str) -> Tuple[str, float, str]:
+    """
+    (dimension, factor, label) of the unit at the start of `text`; words
+    after the unit ("200 г вареного") are ignored.
+    """
+    words = text.split()
+    for count in (2, 1):
+        unit = _normalize_unit(" ".join(words[:count]))
+        if len(words) >= count and unit in UNITS:
+            dimension, factor = UNITS[unit]
+            return dimension, factor, dimension
+    word = words[0].strip(".,;:") if words else ""
+    if not word.isalpha() or word.endswith(_ADJECTIVE_ENDINGS):
+        # No unit, only a description: "2 крупных"
+        return PIECES, 1, PIECES
+    # Unknown unit ("зубчик", "пучок"): merged by stem, shown as written
+    return _stem(word), 1, word
+
+
+def _parse_plain(text: str) -> Optional[Tuple[float, str, str]]:
+    match = _AMOUNT_RE.match(text.strip())
+    if not match:
+        return None
+
+    quantity = _to_number(match.group("upper") or match.group("number"))
+    if match.group("whole") and not match.group("upper"):
+        quantity += float(match.group("whole"))
+    dimension, factor, label = _parse_unit(match.group("unit"))
+    return quantity * factor, dimension, label
+
+
+def parse_amount(amount: Any) -> Optional[Tuple[float, str, str]]:
+    """
+    Parses an amount into (quantity in base units, dimension, label).
+    Unknown units get their stem as the dimension and the word as written
+    as the label ("зубчика" -> "зубчик", "зубчика"). An explicit mass or
+    volume in parentheses wins: "1 стакан (200 мл)" is 200 ml.
+    Returns None when there is no quantity ("по вкусу").
+    """
+    if isinstance(amount, (int, float)):
+        return float(amount), PIECES, PIECES
+    if not isinstance(amount, str):
+        return None
+    text = amount.strip().lower()
+    for inner in _PARENTHESES_RE.findall(text):
+        parsed = _parse_plain(inner[1:-1])
+        if parsed is not None and parsed[1] in (MASS, VOLUME):
+            return parsed
+    return _parse_plain(_PARENTHESES_RE.sub(" ", text))
+
+
+def normalize_name(name: str) -> str:
+    """
+    Merge key of an ingredient: lower case, no notes in parentheses, every
+    word reduced to its stem ("Яйцо" and "яйца" are one item).
+    """
+    name = _PARENTHESES_RE.sub("", name).lower().replace("ё", "е")
+    words = _SPACES_RE.sub(" ", name).strip(" ,.").split(" ")
+    return " ".join(_stem(word) for word in words if word)
+
+
+def _format_number(value: float) -> str:
+    value = round(value, 1)
+    return str(int(value)) if value == int(value) else str(value).replace(".", ",")
+
+
+def format_amount(quantity: float, dimension: str, label: Optional[str] = None) -> str:
+    if dimension == MASS:
+        return f"{_format_number(quantity / 1000)} кг" if quantity >= 1000 else f"{_format_number(round(quantity))} г"
+    if dimension == VOLUME:
+        return f"{_format_number(quantity / 1000)} л" if quantity >= 1000 else f"{_format_number(round(quantity))} мл"
+    if dimension == PIECES:
+        return f"{_format_number(quantity)} шт"
+    return f"{_format_number(quantity)} {label or dimension}"
+
+
+def build_shopping_list(diet_plan: Dict[str, Any], days: int = DAYS_PER_WEEK) -> List[Dict[str, str]]:
+    """
+    Sums the ingredients of the daily recipes and scales them to `days`.
+    Items are merged by normalized name and listed in order of first use;
+    an item bought in different dimensions gets them joined with " + ".
+    """
+    items: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+    for recipe in (diet_plan or {}).get("recipes") or []:
+        for ingredient in (recipe or {}).get("ingredients") or []:
+            name = str(ingredient.get("name") or "").strip()
+            key = normalize_name(name)
+            if not key:
+                continue
+            item = items.setdefault(key, {"name": name, "totals": OrderedDict(), "labels": {}, "unquantified": False})
+            parsed = parse_amount(ingredient.get("amount"))
+            if parsed is None:
+                item["unquantified"] = True
+                continue
+            quantity, dimension, label = parsed
+            item["totals"][dimension] = item["totals"].get(dimension, 0.0) + quantity * days
+            # The shortest spelling is usually the base form ("зубчик")
+            known = item["labels"].get(dimension)
+            if known is None or len(label) < len(known):
+                item["labels"][dimension] = label
+
+    shopping_list = []
+    for item in items.values():
+        parts = [
+            format_amount(quantity, dimension, item["labels"].get(dimension))
+            for dimension, quantity in item["totals"].items()
+        ]
+        if not parts:
+            parts = ["по вкусу"]
+        shopping_list.append({"name": item["name"], "amount": " + ".join(parts)})
+    return shopping_list
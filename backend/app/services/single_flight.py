@@ -0,0 +1,157 @@
+import asyncio
+import hashlib
+import json
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from redis.exceptions import RedisError
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.redis import get_async_redis
+
+LOCK_PREFIX = "single_flight:lock:"
+RESULT_PREFIX = "single_flight:result:"
+POLL_INTERVAL_SECONDS = 0.2
+
+# Deletes the lock only if this worker still owns it
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Calls currently running in this process: flight key -> (future, fingerprint)
+_in_flight: Dict[str, Tuple["asyncio.Future[Any]", Optional[str]]] = {}
+# Finished results for the "memory" backend: flight key -> (fingerprint, result)
+_results = TTLCache(maxsize=1000, ttl=settings.PLAN_SINGLEFLIGHT_RESULT_TTL_SECONDS)
+
+
+class FingerprintMismatch(Exception):
+    """
+    The key is already bound to a call with different parameters.
+    """
+
+
+def make_key(*parts: Any) -> str:
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _check(fingerprint: Optional[str], stored: Optional[str]) -> None:
+    if fingerprint != stored:
+        raise FingerprintMismatch("Key was already used with different parameters")
+
+
+async def run(
+    key: str,
+    fn: Callable[[], Awaitable[Any]],
+    result_ttl: Optional[int] = None,
+    fingerprint: Optional[str] = None,
+    reuse_result: bool = True,
+) -> Any:
+    """
+    Runs fn once for concurrent callers with the same key and gives all of
+    them its result. Callers in this process share a future; other workers
+    wait on a Redis lock and read the result, kept for result_ttl seconds
+    (PLAN_SINGLEFLIGHT_RESULT_TTL_SECONDS by default). The result must be
+    JSON-serializable.
+
+    fingerprint binds the key to the call's parameters (FingerprintMismatch
+    when they differ). With reuse_result=False only a call in progress is
+    joined; a finished result is never served.
+    """
+    result_ttl = result_ttl or settings.PLAN_SINGLEFLIGHT_RESULT_TTL_SECONDS
+    while True:
+        entry = _in_flight.get(key)
+        if entry is None:
+            break
+        future, stored = entry
+        _check(fingerprint, stored)
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                # This caller was cancelled, not the leader
+                raise
+            # The leader was cancelled: take over or join the next leader
+
+    future = asyncio.get_running_loop().create_future()
+    entry = (future, fingerprint)
+    _in_flight[key] = entry
+    try:
+        if settings.PLAN_SINGLEFLIGHT_BACKEND == "redis":
+            result = await _run_shared(key, fn, result_ttl, fingerprint, reuse_result)
+        else:
+            cached = _results.get(key) if reuse_result else None
+            if cached is not None:
+                _check(fingerprint, cached[0])
+                result = cached[1]
+            else:
+                result = await fn()
+                _results.set(key, (fingerprint, result), ttl=result_ttl)
+    except Exception as e:
+        future.set_exception(e)
+        # Mark the exception as retrieved when nobody else was waiting
+        future.exception()
+        raise
+    except BaseException:
+        future.cancel()
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        if _in_flight.get(key) is entry:
+            del _in_flight[key]
+
+
+async def _run_shared(
+    key: str,
+    fn: Callable[[], Awaitable[Any]],
+    result_ttl: int,
+    fingerprint: Optional[str],
+    reuse_result: bool,
+) -> Any:
+    token = uuid.uuid4().hex
+    waited = False
+    while True:
+        try:
+            redis = get_async_redis()
+            # Without reuse, only a result published while we waited counts
+            if reuse_result or waited:
+                raw = await redis.get(RESULT_PREFIX + key)
+                if raw is not None:
+                    stored = json.loads(raw)
+                    _check(fingerprint, stored["fingerprint"])
+                    return stored["result"]
+            acquired = await redis.set(LOCK_PREFIX + key, token, nx=True, ex=settings.PLAN_SINGLEFLIGHT_LOCK_SECONDS)
+            if acquired and not reuse_result:
+                # A result of an earlier call must not reach this call's waiters
+                await redis.delete(RESULT_PREFIX + key)
+        except RedisError:
+            # Без Redis дедупликация остаётся только внутри процесса
+            return await fn()
+        if acquired:
+            break
+        # The lock expires on its own if its owner dies, so this loop ends
+        waited = True
+        await asyncio.sleep(POLL_INTERVAL_SECONDS)
+
+    try:
+        result = await fn()
+        try:
+            await redis.set(
+                RESULT_PREFIX + key,
+                json.dumps({"fingerprint": fingerprint, "result": result}, ensure_ascii=False),
+                ex=result_ttl,
+            )
+        except RedisError:
+            pass
+        return result
+    finally:
+        try:
+            await redis.eval(RELEASE_LOCK_SCRIPT, 1, LOCK_PREFIX + key, token)
+        except RedisError:
+            pass
@@ -0,0 +1,118 @@
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from redis.exceptions import RedisError
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.models.user import User
+
+KEY_PREFIX = "user_cache:"
+# Set when tokens are revoked; outlives the row cache so revoked tokens stay
+# rejected until they expire
+TOKEN_VERSION_PREFIX = "token_version:"
+TOKEN_VERSION_TTL_SECONDS = settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+# hashed_password is deliberately not cached; it stays expired on cached
+# instances and is only loaded (lazily) if something reads it
+CACHED_COLUMNS = (
+    "id", "email", "name", "role", "token_version", "is_profile_complete",
+    "gender", "age", "height", "current_goal", "settings", "created_at", "updated_at",
+)
+DATETIME_COLUMNS = ("created_at", "updated_at")
+
+_local = TTLCache(maxsize=settings.USER_CACHE_MAX_ENTRIES, ttl=settings.USER_CACHE_TTL_SECONDS)
+
+
+def _dump(user: User) -> Dict[str, Any]:
+    row = {column: getattr(user, column) for column in CACHED_COLUMNS}
+    for column in DATETIME_COLUMNS:
+        if row[column] is not None:
+            row[column] = row[column].isoformat()
+    return row
+
+
+def _load(row: Dict[str, Any]) -> Dict[str, Any]:
+    row = dict(row)
+    for column in DATETIME_COLUMNS:
+        if row.get(column) is not None:
+            row[column] = datetime.fromisoformat(row[column])
+    return row
+
+
+def get_row(user_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Cached column values for the user, or None on a miss.
+    """
+    if settings.USER_CACHE_BACKEND == "memory":
+        row = _local.get(user_id)
+        return _load(row) if row is not None else None
+    if settings.USER_CACHE_BACKEND == "redis":
+        try:
+            raw = get_redis().get(KEY_PREFIX + user_id)
+        except RedisError:
+            return None
+        return _load(json.loads(raw)) if raw is not None else None
+    return None
+
+
+def set_user(user: User) -> None:
+    row = _dump(user)
+    if settings.USER_CACHE_BACKEND == "memory":
+        _local.set(user.id, row)
+    elif settings.USER_CACHE_BACKEND == "redis":
+        try:
+            get_redis().set(KEY_PREFIX + user.id, json.dumps(row), ex=settings.USER_CACHE_TTL_SECONDS)
+        except RedisError:
+            pass
+
+
+def invalidate(user_id: str) -> None:
+    _local.delete(user_id)
+    if settings.USER_CACHE_BACKEND == "redis":
+        try:
+            get_redis().delete(KEY_PREFIX + user_id)
+        except RedisError:
+            pass
+
+
+def set_token_version(user_id: str, token_version: int) -> None:
+    if settings.USER_CACHE_BACKEND == "memory":
+        _local.set((TOKEN_VERSION_PREFIX, user_id), token_version, ttl=TOKEN_VERSION_TTL_SECONDS)
+    elif settings.USER_CACHE_BACKEND == "redis":
+        try:
+            get_redis().set(TOKEN_VERSION_PREFIX + user_id, token_version, ex=TOKEN_VERSION_TTL_SECONDS)
+        except RedisError:
+            pass
+
+
+def get_token_version(user_id: str) -> Optional[int]:
+    """
+    The user's token_version if known without a DB query: the revocation
+    marker, else the cached row. None when neither is cached.
+    """
+    if settings.USER_CACHE_BACKEND == "memory":
+        marker = _local.get((TOKEN_VERSION_PREFIX, user_id))
+        row = _local.get(user_id)
+    elif settings.USER_CACHE_BACKEND == "redis":
+        try:
+            marker, raw = get_redis().mget(TOKEN_VERSION_PREFIX + user_id, KEY_PREFIX + user_id)
+        except RedisError:
+            return None
+        row = json.loads(raw) if raw is not None else None
+    else:
+        return None
+    if marker is not None:
+        return int(marker)
+    return row["token_version"] if row is not None else None
+
+
+def attach(db: Session, row: Dict[str, Any]) -> User:
+    """
+    Builds a persistent User in the session from cached values, without a SELECT.
+    """
+    user = User(**row)
+    make_transient_to_detached(user)
+    return db.merge(user, load=False)
@@ -1,10 +1,28 @@
-from typing import Optional, List, Dict, Any
+import json
+from typing import Any, Callable, Dict, List, Optional
+from sqlalchemy import Text, cast, func, literal, literal_column, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import JSON, aggregate_order_by
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from datetime import datetime
 
-from app.models.user import User, Progress, Challenge, WorkoutHistory, Plan
+from app.core.config import settings
+from app.models.user import User, Progress, Challenge, WorkoutHistory, Plan, PlanSection
 from app.schemas import user as user_schemas
-from app.core.security import get_password_hash, verify_password
+from app.core.security import get_password_hash, verify_and_update_password
+from app.services import pagination, plan_storage, resource_versions, user_cache
+
+# Session.info key for a list that collects Redis side effects of committed
+# writes; async_user_service runs them off the event loop after run_sync
+AFTER_COMMIT_KEY = "after_commit"
+
+
+def _after_commit(db: Session, fn: Callable[..., Any], *args: Any) -> None:
+    pending = db.info.get(AFTER_COMMIT_KEY)
+    if pending is None:
+        fn(*args)
+    else:
+        pending.append((fn, args))
 
 
 def get_user_by_email(db: Session, email: str) -> Optional[User]:
@@ -15,11 +33,78 @@ def get_user_by_id(db: Session, user_id: str) -> Optional[User]:
     return db.query(User).filter(User.id == user_id).first()
 
 
-def create_user(db: Session, user_in: user_schemas.UserCreate) -> User:
+def get_user_by_id_cached(db: Session, user_id: str) -> Optional[User]:
+    """
+    Like get_user_by_id, but served from the user row cache when possible.
+    Relationships on the returned user still load lazily from the session.
+    """
+    row = user_cache.get_row(user_id)
+    if row is not None:
+        return user_cache.attach(db, row)
+    
+    user = get_user_by_id(db, user_id)
+    if user:
+        user_cache.set_user(user)
+    return user
+
+
+def _json_collection(model, user_id: str, columns: List[str], order_by: str, descending: bool, limit: int):
+    """
+    Scalar subquery aggregating the user's latest `limit` rows of `model` into a JSON array.
+    """
+    order_column = getattr(model, order_by)
+    rows = select(*(getattr(model, column) for column in columns)).where(
+        model.user_id == user_id
+    ).order_by(order_column.desc(), model.id.desc())
+    if limit:
+        rows = rows.limit(limit)
+    rows = rows.subquery()
+    
+    # Keys are inlined: json_build_object takes "any", so bound keys have no inferable type
+    row_json = func.json_build_object(*[arg for column in columns for arg in (literal_column(f"'{column}'"), rows.c[column])])
+    sort_key = rows.c[order_by].desc() if descending else rows.c[order_by]
+    return select(
+        func.coalesce(func.json_agg(aggregate_order_by(row_json, sort_key)), cast(literal("[]"), JSON), type_=JSON)
+    ).scalar_subquery()
+
+
+def get_user_collections(db: Session, user_id: str, limit: Optional[int] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Loads progress, daily_challenges and workout_history for /users/me in one
+    round-trip instead of one lazy load per relationship, keeping the latest
+    `limit` items of each (settings.USER_EMBEDDED_COLLECTION_LIMIT by default).
+    """
+    if limit is None:
+        limit = settings.USER_EMBEDDED_COLLECTION_LIMIT
+    
+    row = db.execute(select(
+        _json_collection(Progress, user_id, ["id", "date", "weight"], "date", False, limit).label("progress"),
+        _json_collection(
+            Challenge, user_id,
+            ["id", "type", "title", "goal", "current", "unit", "completed", "created_at"],
+            "created_at", False, limit,
+        ).label("daily_challenges"),
+        _json_collection(
+            WorkoutHistory, user_id, ["id", "date", "workout_name", "duration_minutes"], "date", True, limit
+        ).label("workout_history"),
+    )).one()
+    return dict(row._mapping)
+
+
+def get_user_profile(db: Session, user: User) -> Dict[str, Any]:
+    """
+    The /users/me payload: user columns plus capped embedded collections.
+    """
+    profile = {field: getattr(user, field) for field in user_schemas.UserInDB.model_fields}
+    profile.update(get_user_collections(db, user.id))
+    return profile
+
+
+def create_user(db: Session, user_in: user_schemas.UserCreate, hashed_password: Optional[str] = None) -> User:
     db_user = User(
         email=user_in.email,
         name=user_in.name,
-        hashed_password=get_password_hash(user_in.password),
+        hashed_password=hashed_password or get_password_hash(user_in.password),
         settings={"theme": "dark", "notifications": True}
     )
     db.add(db_user)
@@ -32,11 +117,19 @@ def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
     user = get_user_by_email(db, email)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    valid, new_hash = verify_and_update_password(password, user.hashed_password)
+    if not valid:
         return None
+    if new_hash:
+        set_password_hash(db, user.id, new_hash)
     return user
 
 
+def set_password_hash(db: Session, user_id: str, hashed_password: str) -> None:
+    db.query(User).filter(User.id == user_id).update({"hashed_password": hashed_password})
+    db.commit()
+
+
 def update_user(db: Session, user_id: str, user_in: user_schemas.UserUpdate) -> User:
     user = get_user_by_id(db, user_id)
     if not user:
@@ -61,6 +154,8 @@ def update_user(db: Session, user_id: str, user_in: user_schemas.UserUpdate) ->
     
     db.add(user)
     db.commit()
+    _after_commit(db, user_cache.invalidate, user_id)
+    _after_commit(db, resource_versions.bump, user_id, resource_versions.PROFILE)
     db.refresh(user)
     return user
 
@@ -77,12 +172,74 @@ def add_progress(db: Session, user_id: str, progress_in: user_schemas.ProgressCr
     
     db.add(db_progress)
     db.commit()
+    _after_commit(db, resource_versions.bump, user_id, resource_versions.PROGRESS)
     db.refresh(db_progress)
     return db_progress
 
 
-def get_user_progress(db: Session, user_id: str) -> List[Progress]:
-    return db.query(Progress).filter(Progress.user_id == user_id).order_by(Progress.date).all()
+def _history_query(
+    db: Session,
+    model,
+    user_id: str,
+    descending: bool,
+    date_from: Optional[datetime],
+    date_to: Optional[datetime],
+    cursor: Optional[str],
+    limit: Optional[int],
+):
+    """
+    Keyset-paginated history on (date, id), served by the (user_id, date) index.
+    """
+    query = db.query(model).filter(model.user_id == user_id)
+    if date_from is not None:
+        query = query.filter(model.date >= date_from)
+    if date_to is not None:
+        query = query.filter(model.date < date_to)
+    if cursor is not None:
+        cursor_date, cursor_id = pagination.decode_cursor(cursor)
+        position = tuple_(model.date, model.id)
+        query = query.filter(
+            position < tuple_(cursor_date, cursor_id) if descending else position > tuple_(cursor_date, cursor_id)
+        )
+    if descending:
+        query = query.order_by(model.date.desc(), model.id.desc())
+    else:
+        query = query.order_by(model.date, model.id)
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
+
+
+def get_user_progress(
+    db: Session,
+    user_id: str,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> List[Progress]:
+    return _history_query(db, Progress, user_id, False, date_from, date_to, cursor, limit)
+
+
+def get_recent_progress(db: Session, user_id: str, limit: int) -> List[Progress]:
+    """
+    The latest `limit` progress entries, oldest first (for charts).
+    """
+    return _history_query(db, Progress, user_id, True, None, None, None, limit)[::-1]
+
+
+def get_last_weight(db: Session, user_id: str) -> Optional[float]:
+    return db.query(Progress.weight).filter(
+        Progress.user_id == user_id
+    ).order_by(Progress.date.desc()).limit(1).scalar()
+
+
+def get_today_challenges(db: Session, user_id: str) -> List[Challenge]:
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    return db.query(Challenge).filter(
+        Challenge.user_id == user_id,
+        Challenge.created_at >= today
+    ).order_by(Challenge.created_at).all()
 
 
 def toggle_challenge(db: Session, user_id: str, challenge_id: str) -> Challenge:
@@ -97,6 +254,7 @@ def toggle_challenge(db: Session, user_id: str, challenge_id: str) -> Challenge:
     challenge.completed = not challenge.completed
     db.add(challenge)
     db.commit()
+    _after_commit(db, resource_versions.bump, user_id, resource_versions.CHALLENGES)
     db.refresh(challenge)
     return challenge
 
@@ -114,48 +272,171 @@ def add_workout_history(db: Session, user_id: str, workout_in: user_schemas.Work
     
     db.add(db_workout)
     db.commit()
+    _after_commit(db, resource_versions.bump, user_id, resource_versions.WORKOUTS)
     db.refresh(db_workout)
     return db_workout
 
 
-def get_workout_history(db: Session, user_id: str) -> List[WorkoutHistory]:
-    return db.query(WorkoutHistory).filter(
-        WorkoutHistory.user_id == user_id
-    ).order_by(WorkoutHistory.date.desc()).all()
+def get_workout_history(
+    db: Session,
+    user_id: str,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> List[WorkoutHistory]:
+    return _history_query(db, WorkoutHistory, user_id, True, date_from, date_to, cursor, limit)
+
+
+SAVE_PLAN_ATTEMPTS = 3
 
 
 def save_plan(db: Session, user_id: str, plan_data: Dict[str, Any]) -> Plan:
-    # Деактивируем все предыдущие планы пользователя
-    db.query(Plan).filter(Plan.user_id == user_id).update({"is_active": False})
-    
-    db_plan = Plan(
-        user_id=user_id,
-        plan_data=plan_data,
-        is_active=True
-    )
-    
-    db.add(db_plan)
-    db.commit()
-    db.refresh(db_plan)
-    return db_plan
+    """
+    Replaces the user's active plan in one transaction. Only the currently
+    active row is touched: it is deactivated and archived into deduplicated
+    sections; ux_plans_user_id_active guarantees there is at most one.
+    """
+    for attempt in range(SAVE_PLAN_ATTEMPTS):
+        previous = db.query(Plan).filter(
+            Plan.user_id == user_id,
+            Plan.is_active == True
+        ).with_for_update().first()
+        if previous is not None:
+            previous.is_active = False
+            plan_storage.archive_plan(db, previous)
+            # The old row must be inactive before the new one is inserted
+            db.flush()
+
+        db_plan = Plan(
+            user_id=user_id,
+            plan_data=plan_data,
+            is_active=True
+        )
+        db.add(db_plan)
+        try:
+            db.commit()
+        except IntegrityError:
+            # A concurrent save activated another plan first; replace that one
+            db.rollback()
+            if attempt == SAVE_PLAN_ATTEMPTS - 1:
+                raise
+            continue
+        _after_commit(db, resource_versions.bump, user_id, resource_versions.PLAN)
+        # No refresh: callers already hold plan_data, reloading it would decode it again
+        return db_plan
 
 
 def get_current_plan(db: Session, user_id: str) -> Optional[Plan]:
-    return db.query(Plan).filter(
+    plan = db.query(Plan).filter(
         Plan.user_id == user_id,
         Plan.is_active == True
-    ).order_by(Plan.created_at.desc()).first()
+    ).first()
+    if plan is not None:
+        plan_storage.load_plan_data(db, [plan])
+    return plan
 
 
-def upgrade_to_premium(db: Session, user_id: str) -> User:
+def get_current_plan_json(db: Session, user_id: str) -> Optional[str]:
+    """
+    The active plan as the JSON text stored in Postgres, without decoding it.
+    """
+    row = db.query(cast(Plan.plan_data, Text)).filter(
+        Plan.user_id == user_id,
+        Plan.is_active == True
+    ).first()
+    if row is None:
+        return None
+    if row[0] is not None:
+        return row[0]
+    # Stored as sections; reassemble
+    plan = get_current_plan(db, user_id)
+    return json.dumps(plan.plan_data, ensure_ascii=False)
+
+
+def _section_contains(name: str, value: Any):
+    # Archived plans: the section row referenced by the plan contains the value
+    return select(PlanSection.hash).where(
+        PlanSection.hash == Plan.section_refs[name]["hash"].astext,
+        PlanSection.data.contains(value),
+    ).exists()
+
+
+def search_plans(
+    db: Session,
+    goal: Optional[str] = None,
+    equipment: Optional[str] = None,
+    active_only: bool = True,
+    skip: int = 0,
+    limit: int = 50,
+) -> List[Dict[str, Any]]:
+    """
+    Admin search over plan contents. Filters are JSONB containment (@>)
+    checks, served by the GIN indexes on plans.plan_data and, for archived
+    plans, plan_sections.data.
+    """
+    query = db.query(Plan)
+    if active_only:
+        query = query.filter(Plan.is_active == True)
+    if goal:
+        condition = Plan.plan_data.contains({"fitnessPlan": {"goal": goal}})
+        if not active_only:
+            condition = or_(condition, _section_contains("fitnessPlan", {"goal": goal}))
+        query = query.filter(condition)
+    if equipment:
+        condition = Plan.plan_data.contains({"requiredEquipment": [{"name": equipment}]})
+        if not active_only:
+            condition = or_(condition, _section_contains("requiredEquipment", [{"name": equipment}]))
+        query = query.filter(condition)
+
+    plans = query.order_by(Plan.created_at.desc()).offset(skip).limit(limit).all()
+    plan_storage.load_plan_data(db, plans)
+    return [
+        {
+            "id": plan.id,
+            "user_id": plan.user_id,
+            "created_at": plan.created_at,
+            "is_active": plan.is_active,
+            "plan_data": plan.plan_data,
+        }
+        for plan in plans
+    ]
+
+
+def revoke_tokens(db: Session, user_id: str) -> User:
+    """
+    Invalidates every access token issued to the user so far.
+    """
     user = get_user_by_id(db, user_id)
     if not user:
         raise ValueError("User not found")
     
+    user.token_version = User.token_version + 1
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    _after_commit(db, user_cache.invalidate, user_id)
+    _after_commit(db, user_cache.set_token_version, user_id, user.token_version)
+    return user
+
+
+def upgrade_to_premium(db: Session, user_id: str) -> User:
+    """
+    Changes the role and revokes issued tokens, whose role claim is now
+    stale; the caller issues a new token for user.token_version.
+    """
+    user = get_user_by_id(db, user_id)
+    if not user:
+        raise ValueError("User not found")
+
     user.role = "premium"
+    user.token_version = User.token_version + 1
     user.updated_at = datetime.utcnow()
-    
+
     db.add(user)
     db.commit()
     db.refresh(user)
+    _after_commit(db, user_cache.invalidate, user_id)
+    _after_commit(db, user_cache.set_token_version, user_id, user.token_version)
+    _after_commit(db, resource_versions.bump, user_id, resource_versions.PROFILE)
     return user 
\ No newline at end of file
@@ -0,0 +1,158 @@
+import asyncio
+import uuid
+from typing import Any, Dict, Optional
+
+from celery import Celery
+from celery.result import AsyncResult
+from celery.schedules import crontab
+from redis.exceptions import RedisError
+
+from app.core import http_client
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.db.base import SessionLocal
+from app.services import ai_service, nutrition, user_service
+
+celery_app = Celery(
+    "ussr_space",
+    broker=settings.CELERY_BROKER_URL,
+    backend=settings.CELERY_RESULT_BACKEND,
+)
+celery_app.conf.update(
+    task_always_eager=settings.CELERY_TASK_ALWAYS_EAGER,
+    task_store_eager_result=True,
+    task_eager_propagates=False,
+    task_track_started=True,
+    task_acks_late=True,
+    worker_prefetch_multiplier=1,
+    result_expires=settings.PLAN_JOB_RESULT_TTL_SECONDS,
+    task_serializer="json",
+    result_serializer="json",
+    accept_content=["json"],
+    beat_schedule={
+        "recompute-nutrition-targets": {
+            "task": "nutrition.recompute_targets",
+            "schedule": crontab(hour=settings.NUTRITION_RECOMPUTE_HOUR, minute=0),
+        },
+    },
+)
+
+
+async def _generate_plan(user, goal: str, last_weight: Optional[float], use_cache: bool) -> Dict[str, Any]:
+    # Свой HTTP-клиент на время задачи: общий клиент привязан к циклу событий приложения
+    async with http_client.create_client() as client:
+        return await ai_service.generate_plan(user, goal, last_weight, use_cache=use_cache, client=client)
+
+
+# job id -> owner; Celery reports unknown ids as PENDING, so this key is
+# also what tells a real job from a wrong or expired id
+JOB_OWNER_PREFIX = "job:"
+JOB_STORE_RETRY_AFTER_SECONDS = 5
+
+
+class JobStoreUnavailableError(Exception):
+    """
+    Raised when job owners cannot be read or written (Redis is down).
+    """
+
+
+def _touch_job_owner(job_id: str) -> None:
+    # The result outlives the task by result_expires; so does the owner key
+    try:
+        get_redis().expire(JOB_OWNER_PREFIX + job_id, settings.PLAN_JOB_RESULT_TTL_SECONDS)
+    except RedisError:
+        # The key keeps the TTL it was created with
+        pass
+
+
+@celery_app.task(name="plans.generate", bind=True)
+def generate_plan_task(self, user_id: str, goal: str, use_cache: bool = True) -> Dict[str, Any]:
+    """
+    Generates a plan with Gemini and stores it as the user's active plan.
+    """
+    _touch_job_owner(self.request.id)
+    db = SessionLocal()
+    try:
+        user = user_service.get_user_by_id(db, user_id)
+        if not user:
+            raise ValueError("User not found")
+
+        last_weight = user_service.get_last_weight(db, user_id)
+        plan_data = asyncio.run(_generate_plan(user, goal, last_weight, use_cache))
+        user_service.save_plan(db, user_id=user_id, plan_data=plan_data)
+        return plan_data
+    finally:
+        db.close()
+        _touch_job_owner(self.request.id)
+
+
+def enqueue_plan_job(user_id: str, goal: str, use_cache: bool = True) -> str:
+    """
+    Queues plan generation and records who owns the job. Returns the job id.
+    """
+    job_id = str(uuid.uuid4())
+    # Owner first: in eager mode the task runs inside apply_async. The key
+    # must also survive time spent in the queue before the task refreshes it
+    try:
+        get_redis().set(
+            JOB_OWNER_PREFIX + job_id,
+            user_id,
+            ex=settings.PLAN_JOB_RESULT_TTL_SECONDS + settings.PLAN_JOB_QUEUE_TTL_SECONDS,
+        )
+    except RedisError as e:
+        raise JobStoreUnavailableError(str(e)) from e
+    generate_plan_task.apply_async(
+        kwargs={"user_id": user_id, "goal": goal, "use_cache": use_cache},
+        task_id=job_id,
+    )
+    return job_id
+
+
+@celery_app.task(name="nutrition.recompute_targets")
+def recompute_targets_task() -> int:
+    """
+    Nightly: refreshes calorie and macro targets of active plans after
+    weight or profile changes, without regenerating them.
+    """
+    db = SessionLocal()
+    try:
+        return nutrition.recompute_plan_targets(db, batch_size=settings.NUTRITION_BATCH_SIZE)
+    finally:
+        db.close()
+
+
+JOB_STATES = {
+    "PENDING": "pending",
+    "RECEIVED": "pending",
+    "STARTED": "running",
+    "RETRY": "running",
+    "SUCCESS": "succeeded",
+    "FAILURE": "failed",
+    "REVOKED": "failed",
+}
+FINAL_JOB_STATES = ("succeeded", "failed")
+
+
+def get_job_status(job_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Returns the job resource, or None when the job does not exist, has
+    expired or belongs to another user. Raises JobStoreUnavailableError
+    when that cannot be checked.
+    """
+    try:
+        owner = get_redis().get(JOB_OWNER_PREFIX + job_id)
+    except RedisError as e:
+        raise JobStoreUnavailableError(str(e)) from e
+    if isinstance(owner, bytes):
+        owner = owner.decode()
+    if owner != user_id:
+        return None
+
+    result = AsyncResult(job_id, app=celery_app)
+
+    job: Dict[str, Any] = {"id": job_id, "status": JOB_STATES.get(result.state, "pending")}
+    if job["status"] == "succeeded":
+        job["plan"] = result.result
+    elif job["status"] == "failed":
+        job["error"] = str(result.result)
+    return job
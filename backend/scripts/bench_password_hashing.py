@@ -0,0 +1,62 @@
+"""
+Login throughput benchmark for bcrypt verification.
+
+Compares verifying inline on a thread pool (what the sync login endpoint
+did, sharing Starlette's 40 threads) with the dedicated process pool used
+by app.core.security. Prints verifications per second and per core.
+
+    cd backend
+    python -m scripts.bench_password_hashing --requests 200 --concurrency 40
+"""
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core import security
+from app.core.config import settings
+
+
+async def _run(verify, requests: int, concurrency: int) -> float:
+    hashed = security.get_password_hash("benchmark-password")
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with semaphore:
+            await verify("benchmark-password", hashed)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return requests / (time.perf_counter() - start)
+
+
+async def main(requests: int, concurrency: int) -> None:
+    cores = os.cpu_count() or 1
+    threads = ThreadPoolExecutor(max_workers=40)
+
+    async def verify_in_threads(password: str, hashed: str) -> None:
+        await asyncio.get_running_loop().run_in_executor(threads, security.verify_password, password, hashed)
+
+    # Warm the process pool so worker start-up is not measured
+    security.start_hash_executor()
+    await security.verify_and_update_password_async("warmup", security.get_password_hash("warmup"))
+
+    print(f"bcrypt rounds={settings.BCRYPT_ROUNDS} cores={cores} requests={requests} concurrency={concurrency}")
+    for name, verify in (
+        ("threadpool (40 threads)", verify_in_threads),
+        ("process pool", security.verify_and_update_password_async),
+    ):
+        rate = await _run(verify, requests, concurrency)
+        print(f"{name:<24} {rate:8.1f} logins/s  {rate / cores:7.1f} logins/s/core")
+
+    threads.shutdown()
+    security.shutdown_hash_executor()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=40)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
@@ -0,0 +1,110 @@
+"""
+Moves the JSON of inactive plans into deduplicated plan_sections and
+reports the storage saved. Safe to re-run: archived rows are skipped.
+
+    cd backend
+    python -m scripts.compact_plans --batch-size 500
+    python -m scripts.compact_plans --report     # sizes only, no changes
+    python -m scripts.compact_plans --expand     # undo, before downgrading 0004
+"""
+import argparse
+
+from sqlalchemy import func
+
+from app.db.base import SessionLocal
+from app.models.user import Plan, PlanSection
+from app.services import plan_storage
+
+
+def compact(batch_size: int) -> None:
+    db = SessionLocal()
+    rows = original_bytes = added_bytes = 0
+    last_id = ""
+    try:
+        while True:
+            plans = (
+                db.query(Plan)
+                .filter(Plan.is_active == False, Plan.plan_data.isnot(None), Plan.id > last_id)
+                .order_by(Plan.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not plans:
+                break
+            for plan in plans:
+                original_bytes += len(plan_storage.canonical_json(plan.plan_data))
+                added_bytes += plan_storage.archive_plan(db, plan)
+            db.commit()
+            rows += len(plans)
+            last_id = plans[-1].id
+            print(f"archived {rows} plans")
+    finally:
+        db.close()
+
+    print(f"plans archived:      {rows}")
+    print(f"plan JSON (logical): {original_bytes:>14,} bytes")
+    print(f"new section bytes:   {added_bytes:>14,} bytes")
+    print(f"saved:               {original_bytes - added_bytes:>14,} bytes")
+
+
+def expand(batch_size: int) -> None:
+    db = SessionLocal()
+    rows = 0
+    try:
+        while True:
+            plans = db.query(Plan).filter(Plan.plan_data.is_(None), Plan.section_refs.isnot(None)).limit(batch_size).all()
+            if not plans:
+                break
+            for plan, plan_data in zip(plans, plan_storage.load_plan_data(db, plans)):
+                plan.plan_data = plan_data
+                plan.section_refs = None
+            db.commit()
+            rows += len(plans)
+            print(f"expanded {rows} plans")
+    finally:
+        db.close()
+
+
+def report() -> None:
+    """
+    On-disk sizes as Postgres stores them (after TOAST compression).
+    """
+    db = SessionLocal()
+    try:
+        inline_rows, inline_bytes = db.query(
+            func.count(Plan.id), func.coalesce(func.sum(func.pg_column_size(Plan.plan_data)), 0)
+        ).filter(Plan.plan_data.isnot(None)).one()
+        archived_rows, refs_bytes = db.query(
+            func.count(Plan.id), func.coalesce(func.sum(func.pg_column_size(Plan.section_refs)), 0)
+        ).filter(Plan.section_refs.isnot(None)).one()
+        section_rows, section_bytes, logical_bytes = db.query(
+            func.count(PlanSection.hash),
+            func.coalesce(func.sum(func.pg_column_size(PlanSection.data)), 0),
+            func.coalesce(func.sum(PlanSection.size_bytes), 0),
+        ).one()
+    finally:
+        db.close()
+
+    print(f"inline plans:     {inline_rows:>8}  {inline_bytes:>14,} bytes")
+    print(f"archived plans:   {archived_rows:>8}  {refs_bytes:>14,} bytes (section refs)")
+    print(f"plan sections:    {section_rows:>8}  {section_bytes:>14,} bytes ({logical_bytes:,} logical)")
+    if archived_rows and inline_rows:
+        # Archived plans would cost about as much as inline ones
+        estimated = inline_bytes / inline_rows * archived_rows
+        print(f"estimated saved:            {estimated - refs_bytes - section_bytes:>14,.0f} bytes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--batch-size", type=int, default=500)
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--report", action="store_true")
+    group.add_argument("--expand", action="store_true")
+    args = parser.parse_args()
+    if args.report:
+        report()
+    elif args.expand:
+        expand(args.batch_size)
+    else:
+        compact(args.batch_size)
+        report()
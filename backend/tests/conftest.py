@@ -0,0 +1,42 @@
+import os
+
+# Single-process backends so the app runs without Redis; must be set before
+# app.core.config is imported
+os.environ.setdefault("RATE_LIMIT_BACKEND", "memory")
+os.environ.setdefault("RESOURCE_VERSION_BACKEND", "memory")
+os.environ.setdefault("RESPONSE_CACHE_BACKEND", "memory")
+os.environ.setdefault("USER_CACHE_BACKEND", "memory")
+os.environ.setdefault("PLAN_SINGLEFLIGHT_BACKEND", "memory")
+os.environ.setdefault("GEMINI_LIMITER_BACKEND", "memory")
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import deps
+from app.db.base import get_db
+from app.main import app
+from app.schemas.user import Principal
+
+USER_ID = "user-1"
+
+
+@pytest.fixture
+def client():
+    """
+    Client authenticated as USER_ID, without a database session; tests
+    monkeypatch the user_service functions the endpoint calls.
+    """
+    app.dependency_overrides[deps.get_current_principal] = lambda: Principal(id=USER_ID, role="user")
+    app.dependency_overrides[get_db] = lambda: None
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    from app.services import resource_versions, response_cache
+    yield
+    response_cache._local.clear()
+    resource_versions._local.clear()
@@ -0,0 +1,26 @@
+from typing import Any, Dict, Optional
+
+
+class FakeRedis:
+    """
+    The few sync Redis commands the services use, without expiry.
+    """
+
+    def __init__(self) -> None:
+        self.data: Dict[str, Any] = {}
+
+    def get(self, key: str) -> Optional[bytes]:
+        value = self.data.get(key)
+        return str(value).encode() if value is not None and not isinstance(value, bytes) else value
+
+    def set(self, key: str, value: Any, ex: Optional[int] = None, nx: bool = False) -> bool:
+        if nx and key in self.data:
+            return False
+        self.data[key] = value
+        return True
+
+    def expire(self, key: str, seconds: int) -> bool:
+        return key in self.data
+
+    def delete(self, *keys: str) -> int:
+        return sum(self.data.pop(key, None) is not None for key in keys)
@@ -0,0 +1,39 @@
+import asyncio
+import threading
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services import async_user_service, user_service
+
+
+def test_redis_side_effects_run_off_the_event_loop():
+    calls = []
+
+    def side_effect(user_id):
+        calls.append((user_id, threading.get_ident()))
+
+    def write(db, user_id):
+        user_service._after_commit(db, side_effect, user_id)
+        assert calls == []
+        return "done"
+
+    async def main():
+        db = AsyncSession()
+        result = await async_user_service._run(db, write, user_id="user-1")
+        assert user_service.AFTER_COMMIT_KEY not in db.info
+        return result, threading.get_ident()
+
+    result, loop_thread = asyncio.run(main())
+    assert result == "done"
+    assert [user_id for user_id, _ in calls] == ["user-1"]
+    assert calls[0][1] != loop_thread
+
+
+def test_side_effects_run_immediately_with_a_sync_session():
+    calls = []
+
+    class Db:
+        info = {}
+
+    user_service._after_commit(Db(), calls.append, "user-1")
+    assert calls == ["user-1"]
@@ -0,0 +1,56 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.core import metrics
+from app.services import gemini_limits
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(gemini_limits, "backoff_delay", lambda attempt, retry_after=None: 0)
+    monkeypatch.setattr(gemini_limits, "breaker", gemini_limits.CircuitBreaker())
+
+
+def _sender(*outcomes):
+    calls = []
+
+    async def send():
+        outcome = outcomes[len(calls)]
+        calls.append(outcome)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return httpx.Response(outcome, request=httpx.Request("POST", "https://gemini.test"))
+
+    return send, calls
+
+
+def test_retries_retryable_statuses():
+    send, calls = _sender(503, 429, 200)
+    response = asyncio.run(gemini_limits.send_with_retries(send))
+    assert response.status_code == 200
+    assert len(calls) == 3
+
+
+def test_pool_timeout_is_neither_retried_nor_a_breaker_failure():
+    send, calls = _sender(httpx.PoolTimeout("pool full"), 200)
+    before = metrics.GEMINI_HTTP_POOL_TIMEOUTS._value.get()
+    with pytest.raises(httpx.PoolTimeout):
+        asyncio.run(gemini_limits.send_with_retries(send))
+    assert len(calls) == 1
+    assert gemini_limits.breaker._failures == 0
+    assert metrics.GEMINI_HTTP_POOL_TIMEOUTS._value.get() == before + 1
+
+
+def test_transport_errors_count_against_the_breaker():
+    send, calls = _sender(httpx.ConnectError("down"), 200)
+    asyncio.run(gemini_limits.send_with_retries(send))
+    assert len(calls) == 2
+    # The success after the retry closes the breaker again
+    assert gemini_limits.breaker._failures == 0
+
+
+def test_parse_retry_after_seconds():
+    response = httpx.Response(429, headers={"Retry-After": "7"})
+    assert gemini_limits.parse_retry_after(response) == 7.0
@@ -0,0 +1,41 @@
+from enum import Enum
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from app.schemas.plan import GeneratedPlan
+from app.services.gemini_schema import response_schema
+
+
+class Level(str, Enum):
+    easy = "easy"
+    hard = "hard"
+
+
+class Item(BaseModel):
+    name: str = Field(description="Название")
+    level: Level
+    weight: Optional[float]
+    note: str = ""
+
+
+class Model(BaseModel):
+    items: List[Item]
+    count: int
+
+
+def test_models_are_converted_to_the_openapi_subset():
+    schema = response_schema(Model)
+    assert schema["type"] == "OBJECT"
+    assert schema["required"] == schema["propertyOrdering"] == ["items", "count"]
+    assert schema["properties"]["count"] == {"type": "INTEGER"}
+    item = schema["properties"]["items"]["items"]
+    # Fields with defaults are filled in by the server, not requested
+    assert list(item["properties"]) == ["name", "level", "weight"]
+    assert item["properties"]["name"] == {"type": "STRING", "description": "Название"}
+    assert item["properties"]["level"] == {"type": "STRING", "enum": ["easy", "hard"]}
+    assert item["properties"]["weight"] == {"type": "NUMBER", "nullable": True}
+
+
+def test_plan_schema_has_no_refs():
+    assert "$ref" not in str(response_schema(GeneratedPlan))
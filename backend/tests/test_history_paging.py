@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.services import pagination, user_service
+from tests.conftest import USER_ID
+
+
+def _entries(count):
+    start = datetime(2024, 1, 1)
+    return [SimpleNamespace(id=f"p{i}", date=start + timedelta(days=i), weight=70.0 + i) for i in range(count)]
+
+
+def test_cursor_round_trip():
+    date = datetime(2024, 3, 1, 12, 30)
+    assert pagination.decode_cursor(pagination.encode_cursor(date, "abc|def")) == (date, "abc|def")
+
+
+def test_decode_cursor_rejects_garbage():
+    with pytest.raises(ValueError):
+        pagination.decode_cursor("not a cursor")
+
+
+def test_paginate_returns_cursor_of_last_item_only_when_more_rows_exist():
+    items = _entries(3)
+    page, cursor = pagination.paginate(items, 2)
+    assert page == items[:2]
+    assert pagination.decode_cursor(cursor) == (items[1].date, items[1].id)
+    assert pagination.paginate(items, 3) == (items, None)
+
+
+def test_progress_without_limit_or_cursor_is_capped(client, monkeypatch):
+    calls = []
+
+    def fake_progress(db, user_id, limit=None, **filters):
+        calls.append(limit)
+        return _entries(150)[:limit]
+
+    monkeypatch.setattr(user_service, "get_user_progress", fake_progress)
+    monkeypatch.setattr(settings, "HISTORY_PAGE_MAX_LIMIT", 120)
+    response = client.get("/api/v1/users/me/progress")
+    assert response.status_code == 200
+    assert len(response.json()) == 120
+    assert "X-Next-Cursor" in response.headers
+    assert calls == [121]
+
+
+def test_progress_with_limit_is_paged(client, monkeypatch):
+    def fake_progress(db, user_id, limit=None, **filters):
+        assert user_id == USER_ID
+        return _entries(150)[:limit]
+
+    monkeypatch.setattr(user_service, "get_user_progress", fake_progress)
+    response = client.get("/api/v1/users/me/progress?limit=10")
+    assert response.status_code == 200
+    assert len(response.json()) == 10
+    assert "X-Next-Cursor" in response.headers
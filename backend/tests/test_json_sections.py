@@ -0,0 +1,37 @@
+import json
+
+import pytest
+
+from app.services.json_sections import SectionParser
+
+PLAN = {
+    "fitnessPlan": {"id": "f", "note": "скобки } и \"кавычки\" внутри строки"},
+    "requiredEquipment": ["гантели", "коврик"],
+    "count": 3,
+    "flag": True,
+}
+
+
+def _feed_all(text, size):
+    parser = SectionParser()
+    sections = []
+    for start in range(0, len(text), size):
+        sections.extend(parser.feed(text[start:start + size]))
+    return parser, sections
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 1000])
+def test_sections_are_reported_for_any_chunking(size):
+    text = "```json\n" + json.dumps(PLAN, ensure_ascii=False, indent=2) + "\n```"
+    parser, sections = _feed_all(text, size)
+    assert [key for key, _ in sections] == list(PLAN)
+    assert {key: json.loads(raw) for key, raw in sections} == PLAN
+    assert parser.text == text
+
+
+def test_section_is_reported_as_soon_as_it_is_complete():
+    parser = SectionParser()
+    assert parser.feed('{"a": {"b": [1, 2') == []
+    assert parser.feed("]}") == [("a", '{"b": [1, 2]}')]
+    assert parser.feed(', "c": 4') == []
+    assert parser.feed("}") == [("c", "4")]
@@ -0,0 +1,12 @@
+from fastapi.testclient import TestClient
+
+from app.core import http_client, security
+from app.main import app
+
+
+def test_shared_resources_live_for_the_app_lifespan():
+    with TestClient(app):
+        assert http_client._client is not None
+        assert security._hash_executor is not None
+    assert http_client._client is None
+    assert security._hash_executor is None
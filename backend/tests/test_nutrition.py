@@ -0,0 +1,75 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.services import nutrition, resource_versions
+
+
+def test_compute_targets():
+    targets = nutrition.compute_targets("male", 30, 180, 80, "maintain")
+    assert targets["caloriesPerDay"] == 2873
+    assert targets["protein"] == 128
+    assert nutrition.compute_targets("male", None, 180, 80, "maintain") is None
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def all(self):
+        return self._rows
+
+
+class _Connection:
+    def __init__(self):
+        self.calls = []
+
+    def execute(self, statement, params):
+        self.calls.append((statement, params))
+
+
+class _Session(Session):
+    """
+    Real Session (so ORM execution rules apply) whose plan SELECT returns
+    canned rows and whose connection records the patch.
+    """
+
+    def __init__(self, rows):
+        super().__init__(bind=create_engine("sqlite://"))
+        self._pages = [rows, []]
+        self.recorded = _Connection()
+
+    def execute(self, statement, params=None, **kwargs):
+        if params is None and statement.is_select:
+            return _Result(self._pages.pop(0))
+        return super().execute(statement, params, **kwargs)
+
+    def connection(self, *args, **kwargs):
+        return self.recorded
+
+    def commit(self):
+        pass
+
+
+def test_recompute_plan_targets_patches_changed_plans():
+    current = nutrition.compute_targets("male", 30, 180, 80, "maintain")
+    macros = {name: current[name] for name in ("protein", "fat", "carbs")}
+    rows = [
+        ("plan-1", "male", 30, 180, 80, "maintain", str(current["caloriesPerDay"]), macros, "user-1"),
+        ("plan-2", "male", 30, 180, 90, "maintain", str(current["caloriesPerDay"]), macros, "user-2"),
+        ("plan-3", "male", None, 180, 90, "maintain", None, None, "user-3"),
+    ]
+    before = resource_versions.get_versions("user-2", [resource_versions.PLAN])
+    db = _Session(rows)
+
+    assert nutrition.recompute_plan_targets(db) == 1
+
+    [(_, params)] = db.recorded.calls
+    expected = nutrition.compute_targets("male", 30, 180, 90, "maintain")
+    assert params == [{
+        "plan_id": "plan-2",
+        "calories": expected["caloriesPerDay"],
+        "protein": expected["protein"],
+        "fat": expected["fat"],
+        "carbs": expected["carbs"],
+    }]
+    assert resource_versions.get_versions("user-2", [resource_versions.PLAN]) != before
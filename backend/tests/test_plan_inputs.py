@@ -0,0 +1,45 @@
+import asyncio
+from types import SimpleNamespace
+
+from app.services import ai_service
+
+
+def _user(age, height):
+    return SimpleNamespace(gender="male", age=age, height=height)
+
+
+def test_prompt_uses_exact_values():
+    plan_inputs = ai_service.get_plan_inputs(_user(31, 178), "weight_loss", 82.4)
+    prompt = ai_service.build_plan_prompt(plan_inputs)
+    assert "Возраст: 31" in prompt
+    assert "Рост: 178 см" in prompt
+    assert "Текущий вес: 82.4 кг" in prompt
+
+
+def test_cache_key_is_bucketed():
+    first = ai_service.get_plan_inputs(_user(31, 178), "weight_loss", 82.4)
+    second = ai_service.get_plan_inputs(_user(29, 179), "weight_loss", 81.8)
+    other = ai_service.get_plan_inputs(_user(45, 178), "weight_loss", 82.4)
+    assert ai_service.get_plan_cache_key(first) == ai_service.get_plan_cache_key(second)
+    assert ai_service.get_plan_cache_key(first) != ai_service.get_plan_cache_key(other)
+
+
+def test_regenerate_falls_back_for_legacy_plans(monkeypatch):
+    calls = []
+
+    async def generate_plan(user, goal, last_weight, use_cache=True, client=None):
+        calls.append(use_cache)
+        return {"regenerated": True}
+
+    monkeypatch.setattr(ai_service, "generate_plan", generate_plan)
+    user = SimpleNamespace(gender="male", age=31, height=178, is_profile_complete=True)
+    legacy_plan = {
+        "fitnessPlan": {"id": "f", "workouts": [{"day": "Пн", "exercises": [{"name": "Присед", "sets": "3"}]}]},
+        "dietPlan": {"id": "d", "recipes": "нет"},
+        "requiredEquipment": [],
+    }
+    result = asyncio.run(
+        ai_service.regenerate_sections(user, "weight_loss", 82.4, legacy_plan, ["requiredEquipment"])
+    )
+    assert result == {"regenerated": True}
+    assert calls == [False]
@@ -0,0 +1,53 @@
+from types import SimpleNamespace
+
+import pytest
+from redis.exceptions import RedisError
+
+from app import worker
+from app.api import deps
+from app.main import app
+from tests.conftest import USER_ID
+from tests.fakes import FakeRedis
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(worker, "get_redis", lambda: fake)
+    monkeypatch.setattr(worker.generate_plan_task, "apply_async", lambda **kwargs: None)
+    monkeypatch.setattr(worker, "AsyncResult", lambda job_id, app: SimpleNamespace(state="PENDING"))
+    return fake
+
+
+def test_unknown_job_id_is_not_found(redis):
+    assert worker.get_job_status("no-such-job", "u1") is None
+
+
+def test_job_is_visible_to_its_owner_only(redis):
+    job_id = worker.enqueue_plan_job("u1", "maintain")
+    assert worker.get_job_status(job_id, "u1") == {"id": job_id, "status": "pending"}
+    assert worker.get_job_status(job_id, "u2") is None
+
+
+class _DownRedis:
+    def get(self, key):
+        raise RedisError("connection refused")
+
+    def set(self, *args, **kwargs):
+        raise RedisError("connection refused")
+
+
+def test_redis_outage_is_reported_as_unavailable(monkeypatch):
+    monkeypatch.setattr(worker, "get_redis", lambda: _DownRedis())
+    with pytest.raises(worker.JobStoreUnavailableError):
+        worker.enqueue_plan_job("u1", "maintain")
+    with pytest.raises(worker.JobStoreUnavailableError):
+        worker.get_job_status("some-job", "u1")
+
+
+def test_job_endpoint_answers_503_during_redis_outage(client, monkeypatch):
+    monkeypatch.setattr(worker, "get_redis", lambda: _DownRedis())
+    app.dependency_overrides[deps.get_current_active_user] = lambda: SimpleNamespace(id=USER_ID)
+    response = client.get("/api/v1/ai/jobs/some-job")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(worker.JOB_STORE_RETRY_AFTER_SECONDS)
@@ -0,0 +1,34 @@
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql
+
+from app.services import progress_analytics
+
+
+def _points(count):
+    return [{"x": float(i), "y": float(i % 5)} for i in range(count)]
+
+
+def test_lttb_keeps_first_and_last_points():
+    points = _points(100)
+    sampled = progress_analytics.lttb(points, 10, "x", "y")
+    assert len(sampled) == 10
+    assert sampled[0] is points[0] and sampled[-1] is points[-1]
+    assert progress_analytics.lttb(points[:5], 10, "x", "y") == points[:5]
+
+
+class _Db:
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, statement):
+        self.statements.append(statement)
+        return SimpleNamespace(one=lambda: SimpleNamespace(count=0))
+
+
+def test_summary_ignores_entries_without_weight():
+    db = _Db()
+    summary = progress_analytics.get_progress_summary(db, "user-1")
+    assert summary["count"] == 0
+    sql = str(db.statements[0].compile(dialect=postgresql.dialect()))
+    assert "progress.weight IS NOT NULL" in sql
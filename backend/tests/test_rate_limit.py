@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from app.core import rate_limit
+from app.services import user_service
+
+
+@pytest.fixture(autouse=True)
+def reset_limits():
+    yield
+    rate_limit.memory_backend.reset()
+
+
+def test_sliding_window_blocks_after_limit():
+    backend = rate_limit.MemorySlidingWindow()
+
+    async def hits():
+        return [(await backend.hit("k", limit=3, window=60))[0] for _ in range(4)]
+
+    assert asyncio.run(hits()) == [True, True, True, False]
+
+
+def test_windows_of_different_lengths_are_counted_separately():
+    backend = rate_limit.MemorySlidingWindow()
+
+    async def hits():
+        await backend.hit("k", limit=1, window=60)
+        return (await backend.hit("k", limit=1, window=10))[0]
+
+    assert asyncio.run(hits()) is True
+
+
+def test_headers_reach_responses_built_by_the_endpoint(client, monkeypatch):
+    monkeypatch.setattr(user_service, "get_current_plan_json", lambda db, user_id: '{"a": 1}')
+    response = client.get("/api/v1/plans/current")
+    assert response.status_code == 200
+    assert response.headers["RateLimit-Limit"] == "60"
+    assert response.headers["RateLimit-Policy"] == "60;w=60"
+
+    not_modified = client.get("/api/v1/plans/current", headers={"If-None-Match": response.headers["ETag"]})
+    assert not_modified.status_code == 304
+    assert "RateLimit-Remaining" in not_modified.headers
+
+
+def test_job_polling_has_its_own_policy(client, monkeypatch):
+    from types import SimpleNamespace
+    from app import worker
+    from app.api import deps
+    from app.main import app
+
+    app.dependency_overrides[deps.get_current_active_user] = lambda: SimpleNamespace(id="user-1")
+    monkeypatch.setattr(worker, "get_job_status", lambda job_id, user_id: None)
+    response = client.get("/api/v1/ai/jobs/unknown")
+    assert response.status_code == 404
+    assert response.headers["RateLimit-Limit"] == "120"
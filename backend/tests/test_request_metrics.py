@@ -0,0 +1,23 @@
+from prometheus_client import REGISTRY
+
+from app.core.config import settings
+
+
+def _count(route, status):
+    value = REGISTRY.get_sample_value(
+        "http_requests_total", {"method": "GET", "route": route, "status": status}
+    )
+    return value or 0.0
+
+
+def test_plain_starlette_routes_get_their_own_label(client):
+    path = f"{settings.API_V1_STR}/openapi.json"
+    before = _count(path, "200")
+    assert client.get(path).status_code == 200
+    assert _count(path, "200") == before + 1
+
+
+def test_unknown_paths_are_unmatched(client):
+    before = _count("unmatched", "404")
+    assert client.get("/no/such/path").status_code == 404
+    assert _count("unmatched", "404") == before + 1
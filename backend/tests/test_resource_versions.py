@@ -0,0 +1,25 @@
+from app.services import resource_versions
+
+
+def test_versions_are_stable_until_bumped():
+    first = resource_versions.get_versions("user-1", ["plan", "progress"])
+    assert resource_versions.get_versions("user-1", ["plan", "progress"]) == first
+    resource_versions.bump("user-1", "plan")
+    second = resource_versions.get_versions("user-1", ["plan", "progress"])
+    assert second[0] != first[0]
+    assert second[1] == first[1]
+
+
+def test_bump_changes_the_version_even_within_one_millisecond(monkeypatch):
+    monkeypatch.setattr(resource_versions, "_now_ms", lambda: 1000)
+    before = resource_versions.get_versions("user-1", ["plan"])
+    resource_versions.bump("user-1", "plan")
+    resource_versions.bump("user-1", "plan")
+    assert int(resource_versions.get_versions("user-1", ["plan"])[0]) == int(before[0]) + 2
+
+
+def test_bump_many_touches_every_user():
+    before = [resource_versions.get_versions(user_id, ["plan"]) for user_id in ("a", "b")]
+    resource_versions.bump_many(["a", "b", "a"], "plan")
+    after = [resource_versions.get_versions(user_id, ["plan"]) for user_id in ("a", "b")]
+    assert all(old != new for old, new in zip(before, after))
@@ -0,0 +1,53 @@
+from fastapi import Response
+
+from app.services import response_cache, user_service
+
+
+def test_cached_body_is_served_without_calling_the_service(client, monkeypatch):
+    calls = []
+
+    def current_plan(db, user_id):
+        calls.append(user_id)
+        return '{"plan": 1}'
+
+    monkeypatch.setattr(user_service, "get_current_plan_json", current_plan)
+    first = client.get("/api/v1/plans/current")
+    second = client.get("/api/v1/plans/current")
+    assert first.content == second.content == b'{"plan": 1}'
+    assert first.headers["ETag"] == second.headers["ETag"]
+    assert len(calls) == 1
+
+
+def test_etag_and_cache_key_change_after_a_write(client, monkeypatch):
+    from app.services import resource_versions
+    from tests.conftest import USER_ID
+
+    monkeypatch.setattr(user_service, "get_current_plan_json", lambda db, user_id: '{"plan": 1}')
+    etag = client.get("/api/v1/plans/current").headers["ETag"]
+    assert client.get("/api/v1/plans/current", headers={"If-None-Match": etag}).status_code == 304
+
+    resource_versions.bump(USER_ID, resource_versions.PLAN)
+    monkeypatch.setattr(user_service, "get_current_plan_json", lambda db, user_id: '{"plan": 2}')
+    response = client.get("/api/v1/plans/current", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json() == {"plan": 2}
+    assert response.headers["ETag"] != etag
+
+
+def test_only_representation_headers_are_cached():
+    injected = Response()
+    injected.headers["ETag"] = '"v1"'
+    injected.headers["X-Request-Scoped"] = "first"
+    injected.set_cookie("a", "1")
+    injected.set_cookie("b", "2")
+    first = response_cache.respond("key", 60, injected, lambda: {"x": 1})
+    assert first.headers["x-request-scoped"] == "first"
+    assert len(first.headers.getlist("set-cookie")) == 2
+
+    later = Response()
+    later.headers["X-Request-Scoped"] = "second"
+    second = response_cache.respond("key", 60, later, lambda: {"x": 2})
+    assert second.body == b'{"x":1}'
+    assert second.headers["etag"] == '"v1"'
+    assert second.headers["x-request-scoped"] == "second"
+    assert "set-cookie" not in second.headers
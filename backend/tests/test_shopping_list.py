@@ -0,0 +1,65 @@
+import pytest
+
+from app.services.shopping_list import build_shopping_list, normalize_name, parse_amount
+
+
+@pytest.mark.parametrize("amount, expected", [
+    ("200 г", (200.0, "g")),
+    ("0,5 кг", (500.0, "g")),
+    ("1 1/2 кг", (1500.0, "g")),
+    ("1-2 шт", (2.0, "pcs")),
+    ("2 ст. л.", (30.0, "ml")),
+    ("1 ст.л. масла", (15.0, "ml")),
+    ("1/2 стакана", (125.0, "ml")),
+    ("3", (3.0, "pcs")),
+    (2, (2.0, "pcs")),
+    # Words after the unit are not part of it
+    ("200 г вареного", (200.0, "g")),
+    ("2 крупных", (2.0, "pcs")),
+    # An explicit metric amount in parentheses wins
+    ("1 стакан (200 мл)", (200.0, "ml")),
+    ("2 шт (около 100 г)", (2.0, "pcs")),
+    ("2 шт (100 г)", (100.0, "g")),
+])
+def test_parse_amount(amount, expected):
+    assert parse_amount(amount)[:2] == expected
+
+
+def test_parse_amount_without_quantity():
+    assert parse_amount("по вкусу") is None
+    assert parse_amount(None) is None
+
+
+def test_unknown_unit_inflections_share_a_dimension():
+    assert parse_amount("1 зубчик")[1] == parse_amount("2 зубчика")[1] == parse_amount("5 зубчиков")[1]
+    assert parse_amount("1 пучок")[1] == parse_amount("2 пучка")[1]
+
+
+def test_name_inflections_are_merged():
+    assert normalize_name("Яйцо") == normalize_name("яйца")
+    assert normalize_name("Куриная грудка (филе)") == normalize_name("куриной грудки")
+    assert normalize_name("Рис") != normalize_name("Гречка")
+
+
+def test_build_shopping_list_merges_and_scales_to_a_week():
+    diet_plan = {"recipes": [
+        {"ingredients": [
+            {"name": "Чеснок", "amount": "1 зубчик"},
+            {"name": "Яйцо", "amount": "2 шт"},
+            {"name": "Молоко", "amount": "1 стакан (200 мл)"},
+            {"name": "Рис", "amount": "200 г вареного"},
+        ]},
+        {"ingredients": [
+            {"name": "чеснок", "amount": "2 зубчика"},
+            {"name": "яйца", "amount": "1"},
+            {"name": "Соль", "amount": "по вкусу"},
+            {"name": "Рис", "amount": "0,1 кг"},
+        ]},
+    ]}
+    assert build_shopping_list(diet_plan) == [
+        {"name": "Чеснок", "amount": "21 зубчик"},
+        {"name": "Яйцо", "amount": "21 шт"},
+        {"name": "Молоко", "amount": "1,4 л"},
+        {"name": "Рис", "amount": "2,1 кг"},
+        {"name": "Соль", "amount": "по вкусу"},
+    ]
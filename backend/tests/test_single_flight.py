@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from app.services import single_flight
+
+
+@pytest.fixture(autouse=True)
+def clear_results():
+    yield
+    single_flight._results.clear()
+
+
+def _counting(result="plan", delay=0.01):
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return result
+
+    return fn, calls
+
+
+def test_concurrent_callers_share_one_call():
+    fn, calls = _counting()
+
+    async def main():
+        return await asyncio.gather(*(single_flight.run("k", fn) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["plan"] * 5
+    assert len(calls) == 1
+
+
+def test_finished_result_is_reused_unless_disabled():
+    fn, calls = _counting()
+
+    async def main():
+        await single_flight.run("k", fn)
+        await single_flight.run("k", fn)
+        await single_flight.run("k", fn, reuse_result=False)
+
+    asyncio.run(main())
+    assert len(calls) == 2
+
+
+def test_fingerprint_mismatch_is_rejected():
+    fn, calls = _counting()
+
+    async def main():
+        await single_flight.run("k", fn, fingerprint="goal-a")
+        assert await single_flight.run("k", fn, fingerprint="goal-a") == "plan"
+        with pytest.raises(single_flight.FingerprintMismatch):
+            await single_flight.run("k", fn, fingerprint="goal-b")
+
+    asyncio.run(main())
+    assert len(calls) == 1
+
+
+def test_waiter_takes_over_when_leader_is_cancelled():
+    fn, calls = _counting(delay=0.05)
+
+    async def main():
+        leader = asyncio.create_task(single_flight.run("k", fn))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(single_flight.run("k", fn))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await waiter
+
+    assert asyncio.run(main()) == "plan"
+    assert len(calls) == 2
@@ -0,0 +1,59 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.api import deps
+from app.main import app
+from app.schemas.user import TokenPayload
+from app.services import user_cache, user_service
+from tests.conftest import USER_ID
+
+EXP = 2_000_000_000
+
+
+@pytest.fixture(autouse=True)
+def clear_user_cache():
+    yield
+    user_cache._local.clear()
+
+
+def test_principal_trusts_claims_when_nothing_is_cached():
+    principal = deps.get_current_principal(db=None, token_data=TokenPayload(sub="u1", exp=EXP, role="user", ver=0))
+    assert (principal.id, principal.role) == ("u1", "user")
+
+
+def test_revocation_marker_rejects_older_tokens():
+    user_cache.set_token_version("u1", 1)
+    with pytest.raises(HTTPException) as exc:
+        deps.get_current_principal(db=None, token_data=TokenPayload(sub="u1", exp=EXP, role="user", ver=0))
+    assert exc.value.status_code == 401
+    assert deps.get_current_principal(db=None, token_data=TokenPayload(sub="u1", exp=EXP, role="user", ver=1)).id == "u1"
+
+
+def test_premium_upgrade_returns_a_token_with_the_new_role(client, monkeypatch):
+    upgraded = SimpleNamespace(id=USER_ID, role="premium", token_version=3)
+
+    def upgrade(db, user_id):
+        # Stands in for the commit: revokes older tokens like the real service
+        user_cache.set_token_version(user_id, upgraded.token_version)
+        return upgraded
+
+    profile = {
+        "id": USER_ID, "email": "u@example.com", "name": "U", "role": "premium",
+        "settings": {"theme": "dark", "notifications": True},
+        "created_at": "2024-01-01T00:00:00", "updated_at": "2024-01-01T00:00:00",
+    }
+    monkeypatch.setattr(user_service, "upgrade_to_premium", upgrade)
+    monkeypatch.setattr(user_service, "get_user_profile", lambda db, user: profile)
+    app.dependency_overrides[deps.get_current_active_user] = lambda: SimpleNamespace(id=USER_ID)
+
+    response = client.post("/api/v1/users/me/premium")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["role"] == "premium"
+    claims = deps.get_token_data(body["access_token"])
+    assert (claims.role, claims.ver) == ("premium", 3)
+    assert deps.get_current_principal(db=None, token_data=claims).role == "premium"
+    with pytest.raises(HTTPException):
+        deps.get_current_principal(db=None, token_data=TokenPayload(sub=USER_ID, exp=EXP, role="user", ver=2))
@@ -95,15 +95,28 @@ export const userAPI = {
   },
   
   upgradeToPremium: async (): Promise<User> => {
-    const response = await api.post<User>('/users/me/premium');
+    // Старые токены отзываются: в них прежняя роль
+    const response = await api.post<User & { access_token: string }>('/users/me/premium');
+    localStorage.setItem('ussr-space-token', response.data.access_token);
     return response.data;
   },
 };
 
+// История отдаётся страницами; следующую страницу указывает заголовок X-Next-Cursor
+const getAllPages = async <T>(url: string): Promise<T[]> => {
+  const items: T[] = [];
+  let cursor: string | undefined;
+  do {
+    const response = await api.get<T[]>(url, { params: cursor ? { cursor } : undefined });
+    items.push(...response.data);
+    cursor = response.headers['x-next-cursor'];
+  } while (cursor);
+  return items;
+};
+
 export const progressAPI = {
   getUserProgress: async (): Promise<Progress[]> => {
-    const response = await api.get<Progress[]>('/users/me/progress');
-    return response.data;
+    return getAllPages<Progress>('/users/me/progress');
   },
   
   addProgress: async (weight: number): Promise<Progress> => {
@@ -114,8 +127,7 @@ export const progressAPI = {
 
 export const workoutAPI = {
   getWorkoutHistory: async (): Promise<WorkoutHistory[]> => {
-    const response = await api.get<WorkoutHistory[]>('/users/me/workout-history');
-    return response.data;
+    return getAllPages<WorkoutHistory>('/users/me/workout-history');
   },
   
   addWorkoutHistory: async (workoutName: string, durationMinutes: number): Promise<WorkoutHistory> => {
@@ -137,7 +137,9 @@ class ApiClient {
 
   async upgradeToPremium(): Promise<User> {
     try {
-      const response = await this.api.post<User>('/users/me/premium');
+      // Старые токены отзываются: в них прежняя роль
+      const response = await this.api.post<User & { access_token: string }>('/users/me/premium');
+      this.setToken(response.data.access_token);
       return response.data;
     } catch (error) {
       console.error('Upgrade to premium error:', error);
@@ -145,11 +147,22 @@ class ApiClient {
     }
   }
 
+  // История отдаётся страницами; следующую страницу указывает заголовок X-Next-Cursor
+  private async getAllPages<T>(url: string): Promise<T[]> {
+    const items: T[] = [];
+    let cursor: string | undefined;
+    do {
+      const response = await this.api.get<T[]>(url, { params: cursor ? { cursor } : undefined });
+      items.push(...response.data);
+      cursor = response.headers['x-next-cursor'];
+    } while (cursor);
+    return items;
+  }
+
   // Методы для работы с прогрессом
   async getUserProgress(): Promise<Progress[]> {
     try {
-      const response = await this.api.get<Progress[]>('/users/me/progress');
-      return response.data;
+      return await this.getAllPages<Progress>('/users/me/progress');
     } catch (error) {
       console.error('Get progress error:', error);
       throw error;
@@ -169,8 +182,7 @@ class ApiClient {
   // Методы для работы с историей тренировок
   async getWorkoutHistory(): Promise<WorkoutHistory[]> {
     try {
-      const response = await this.api.get<WorkoutHistory[]>('/users/me/workout-history');
-      return response.data;
+      return await this.getAllPages<WorkoutHistory>('/users/me/workout-history');
     } catch (error) {
       console.error('Get workout history error:', error);
       throw error;